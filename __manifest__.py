@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     "name": "NYC Events Sync",
+    "version": "18.0.1.2",
     "summary": "Automatically import all public events in New York City from Ticketmaster Discovery API",
     "category": "Website/Events",
     "author": "Waqas Mustafa Developer",
@@ -9,8 +10,11 @@
     "data": [
         "security/ir.model.access.csv",
         "data/ir_actions_server.xml",
+        "data/nyc_events_sync_profile_data.xml",
         "views/res_config_settings_views.xml",
         "views/event_backend_views.xml",
+        "views/nyc_events_sync_run_views.xml",
+        "views/nyc_events_sync_profile_views.xml",
         "views/website_event_templates.xml",
         "data/ir_cron.xml",
     ],
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""End-to-end benchmark of ``_sync_nyc_events`` against the local stand-in.
+
+Run it inside an Odoo shell on a throw-away database with this module
+installed (it creates and then deletes ``BENCH*`` events)::
+
+    odoo-bin shell -d bench_db --no-http < benchmarks/bench_sync.py
+
+Tunables come from the environment:
+
+    BENCH_SIZES       comma-separated catalogue sizes      (default 1000,10000,50000)
+    BENCH_LATENCY     seconds added to every mock response (default 0.02)
+    BENCH_RATE_429    share of API calls answered with 429 (default 0)
+    BENCH_RATE_LIMIT  ticketmaster.rate_limit during runs  (default 5)
+    BENCH_VENUES      distinct venues in the catalogue     (default 200)
+
+The daily quota is lifted for the runs and today's quota counter is reset
+between them (and put back afterwards), so repeated runs on the same day
+are never cut short by the 5000-call budget.
+
+For every size the sync runs twice: a cold import, then a steady-state run
+over the unchanged catalogue. Throughput comes from the run log record,
+memory from tracemalloc (Python heap peak) and ru_maxrss (process peak).
+"""
+import os
+import resource
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) if "__file__" in globals() else "benchmarks")
+
+from mock_ticketmaster import MockTicketmasterServer  # noqa: E402
+
+BENCH_PARAMS = ("ticketmaster.api_key", "ticketmaster.api_url", "ticketmaster.rate_limit", "ticketmaster.daily_quota")
+BENCH_DAILY_QUOTA = 10 ** 9
+
+
+def _today():
+    return datetime.now(timezone.utc).date()
+
+
+def _cleanup(env):
+    env["event.event"].sudo().with_context(active_test=False).search([("ticketmaster_id", "=like", "BENCH%")]).unlink()
+    env["res.partner"].sudo().with_context(active_test=False).search(
+        [("ticketmaster_venue_id", "=like", "BENCHV%")]).unlink()
+    env["nyc.events.sync.state"].sudo().search([]).write({"state": "done", "last_crawled": False})
+    env["nyc.events.sync.quota"].sudo().search([("day", "=", _today())]).unlink()
+    env.cr.commit()
+
+
+def _run_once(env, label, size):
+    tracemalloc.start()
+    started = time.monotonic()
+    # every tier on both passes, so the steady pass covers the whole catalogue again
+    env["nyc.events.sync"]._sync_engine("cron", force_all=True).run()
+    elapsed = time.monotonic() - started
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    run = env["nyc.events.sync.run"].sudo().search([], limit=1)
+    return {
+        "label": label,
+        "size": size,
+        "elapsed": elapsed,
+        "throughput": size / elapsed if elapsed else 0.0,
+        "heap_peak_mb": peak / 2 ** 20,
+        "rss_peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "run": run,
+    }
+
+
+def run(env, sizes=(1000, 10000, 50000), latency=0.02, rate_429=0.0, rate_limit=5, venues=200):
+    ICP = env["ir.config_parameter"].sudo()
+    saved = {key: ICP.get_param(key) for key in BENCH_PARAMS}
+    saved_calls = env["nyc.events.sync.quota"]._calls_today(_today())
+    results = []
+    try:
+        for size in sizes:
+            _cleanup(env)
+            with MockTicketmasterServer(events=size, venues=venues, latency=latency, rate_429=rate_429) as server:
+                ICP.set_param("ticketmaster.api_key", "benchmark")
+                ICP.set_param("ticketmaster.api_url", server.api_url)
+                ICP.set_param("ticketmaster.rate_limit", str(rate_limit))
+                ICP.set_param("ticketmaster.daily_quota", str(BENCH_DAILY_QUOTA))
+                env.cr.commit()
+                results.append(_run_once(env, "cold", size))
+                results.append(_run_once(env, "steady", size))
+        _report(results)
+    finally:
+        for key, value in saved.items():
+            ICP.set_param(key, value or False)
+        _cleanup(env)
+        # calls made to the stand-in do not count; the real ones made earlier today do
+        if saved_calls:
+            env["nyc.events.sync.quota"].sudo().create({"day": _today(), "calls": saved_calls})
+            env.cr.commit()
+    return results
+
+
+def _report(results):
+    header = (f"{'size':>7} {'pass':<7} {'seconds':>8} {'events/s':>9} {'api':>6} {'created':>8} "
+              f"{'unchanged':>9} {'errors':>6} {'heap MB':>8} {'rss MB':>8}")
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        run = result["run"]
+        print(f"{result['size']:>7} {result['label']:<7} {result['elapsed']:>8.1f} {result['throughput']:>9.1f} "
+              f"{run.api_calls:>6} {run.created_count:>8} {run.unchanged_count:>9} {run.error_count:>6} "
+              f"{result['heap_peak_mb']:>8.1f} {result['rss_peak_mb']:>8.1f}")
+        print(f"{'':>16} phases: fetch={run.fetch_time:.1f}s venue={run.venue_time:.1f}s "
+              f"upsert={run.upsert_time:.1f}s images={run.image_time:.1f}s unpublish={run.unpublish_time:.1f}s")
+
+
+if "env" in globals():
+    run(
+        env,  # noqa: F821 - provided by odoo-bin shell
+        sizes=[int(size) for size in os.environ.get("BENCH_SIZES", "1000,10000,50000").split(",")],
+        latency=float(os.environ.get("BENCH_LATENCY", "0.02")),
+        rate_429=float(os.environ.get("BENCH_RATE_429", "0")),
+        rate_limit=float(os.environ.get("BENCH_RATE_LIMIT", "5")),
+        venues=int(os.environ.get("BENCH_VENUES", "200")),
+    )
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""Local stand-in for the Ticketmaster Discovery API, for load tests.
+
+Serves synthetic NYC events on the two endpoints the sync uses:
+
+    /discovery/v2/events.json            (startDateTime/endDateTime/size/page)
+    /discovery/v2/events/<id>.json       (one event by id, as used by stale reconciliation)
+    /discovery/v2/events/<id>/images     (and .../images.json)
+    /img/<id>.png                        (the image bytes themselves)
+
+Events are generated deterministically from their index, spread evenly over
+``horizon_days`` starting now, spread over ``venues`` distinct venues. The
+server enforces the real ``page * size < 1000`` depth limit, can add latency
+to every response and can answer a share of requests with 429.
+
+Standalone usage::
+
+    python3 mock_ticketmaster.py --events 10000 --latency 0.05 --rate-429 0.01
+
+then set the ``ticketmaster.api_url`` system parameter to the printed URL.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SEGMENTS = [
+    ("KZFzniwnSyZfZ7v7nJ", "Music", "Rock"),
+    ("KZFzniwnSyZfZ7v7nE", "Sports", "Basketball"),
+    ("KZFzniwnSyZfZ7v7na", "Arts & Theatre", "Theatre"),
+    ("KZFzniwnSyZfZ7v7nn", "Film", "Drama"),
+    ("KZFzniwnSyZfZ7v7n1", "Miscellaneous", "Family"),
+]
+MAX_DEPTH = 1000
+# 1x1 PNG padded past the sync's 100-byte sanity check
+PNG_BYTES = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000100e221bc33000000"
+    "0049454e44ae426082"
+) + b"\0" * 2048
+
+
+def format_date(dt):
+    """Format an aware UTC datetime the way the Discovery API date filters expect"""
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_date(value):
+    """Parse a Discovery API date filter into an aware UTC datetime"""
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+
+
+class SyntheticCatalogue:
+    def __init__(self, events=1000, venues=200, horizon_days=365, start=None):
+        self.count = events
+        self.venues = max(1, venues)
+        self.start = (start or datetime.now(timezone.utc)).replace(microsecond=0) + timedelta(hours=1)
+        # keep the last event inside a crawl window of the same horizon
+        self.step = timedelta(days=max(1, horizon_days - 1)) / max(1, events)
+
+    def start_of(self, index):
+        return self.start + self.step * index
+
+    def index_range(self, start, end):
+        """Indexes of events starting in ``[start, end]``"""
+        first = max(0, -(-(start - self.start) // self.step)) if start > self.start else 0
+        last = min(self.count - 1, (end - self.start) // self.step) if end >= self.start else -1
+        return range(int(first), int(last) + 1)
+
+    def index_of(self, event_id):
+        """Index of the ``BENCH*`` event id, or None when it is not in the catalogue"""
+        if not event_id.startswith("BENCH") or not event_id[5:].isdigit():
+            return None
+        index = int(event_id[5:])
+        return index if index < self.count else None
+
+    def event(self, index, base_url):
+        event_id = f"BENCH{index:07d}"
+        venue = index % self.venues
+        segment_id, segment, genre = SEGMENTS[index % len(SEGMENTS)]
+        begin = self.start_of(index)
+        return {
+            "id": event_id,
+            "name": f"Benchmark Event {index}",
+            "url": f"https://www.ticketmaster.com/event/{event_id}",
+            "images": [
+                {"url": f"{base_url}/img/{event_id}.png", "width": 1024, "height": 576, "fallback": False},
+                {"url": f"{base_url}/img/{event_id}-small.png", "width": 305, "height": 203, "fallback": False},
+            ],
+            "dates": {
+                "start": {"dateTime": format_date(begin), "localDate": begin.strftime("%Y-%m-%d")},
+                "end": {"dateTime": format_date(begin + timedelta(hours=3))},
+                "status": {"code": "onsale"},
+            },
+            "classifications": [{
+                "segment": {"id": segment_id, "name": segment},
+                "genre": {"name": genre},
+            }],
+            "_embedded": {"venues": [{
+                "id": f"BENCHV{venue:05d}",
+                "name": f"Benchmark Venue {venue}",
+                "postalCode": "10001",
+                "city": {"name": "New York"},
+                "state": {"name": "New York", "stateCode": "NY"},
+                "country": {"name": "United States Of America", "countryCode": "US"},
+                "address": {"line1": f"{venue} Broadway"},
+            }]},
+        }
+
+
+class MockTicketmasterServer:
+    """Threaded HTTP server wrapping a ``SyntheticCatalogue``."""
+
+    def __init__(self, events=1000, venues=200, horizon_days=365, latency=0.0, rate_429=0.0,
+                 host="127.0.0.1", port=0, seed=0):
+        self.catalogue = SyntheticCatalogue(events, venues, horizon_days)
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self):
+        return f"{self.url}/discovery/v2"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="mock-ticketmaster", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, fmt, *args):
+                pass
+
+            def do_GET(self):
+                with server.lock:
+                    server.requests += 1
+                    throttle = server.random.random() < server.rate_429
+                    if throttle:
+                        server.throttled += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                parsed = urlparse(self.path)
+                query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+                path = parsed.path
+                if path.startswith("/img/"):
+                    return self._send(200, PNG_BYTES, "image/png")
+                if throttle:
+                    return self._json(429, {"fault": {"faultstring": "Rate limit quota violation"}},
+                                      {"Retry-After": "1", "Rate-Limit-Available": "0"})
+                if path == "/discovery/v2/events.json":
+                    return self._events(query)
+                if path.startswith("/discovery/v2/events/") and path.split("/")[-1] in ("images", "images.json"):
+                    event_id = path.split("/")[-2]
+                    return self._json(200, {"type": "event", "id": event_id, "images": [
+                        {"url": f"{server.url}/img/{event_id}.png", "width": 1024, "height": 576},
+                    ]})
+                if path.startswith("/discovery/v2/events/") and path.endswith(".json"):
+                    index = server.catalogue.index_of(path.split("/")[-1][:-len(".json")])
+                    if index is not None:
+                        return self._json(200, server.catalogue.event(index, server.url))
+                return self._json(404, {"errors": [{"code": "DIS1004", "detail": "Resource not found"}]})
+
+            def _events(self, query):
+                catalogue = server.catalogue
+                size = min(int(query.get("size", 20)), 200)
+                page = int(query.get("page", 0))
+                if (page + 1) * size > MAX_DEPTH:
+                    return self._json(400, {"errors": [{"code": "DIS1035", "detail": "API Limits Exceeded"}]})
+                start = parse_date(query["startDateTime"]) if "startDateTime" in query else catalogue.start
+                end = parse_date(query["endDateTime"]) if "endDateTime" in query else catalogue.start_of(catalogue.count)
+                indexes = catalogue.index_range(start, end)
+                total = len(indexes)
+                selected = indexes[page * size:(page + 1) * size]
+                body = {"page": {"size": size, "number": page, "totalElements": total,
+                                 "totalPages": -(-total // size) if size else 0}}
+                if selected:
+                    body["_embedded"] = {"events": [catalogue.event(index, server.url) for index in selected]}
+                return self._json(200, body)
+
+            def _json(self, status, body, headers=None):
+                self._send(status, json.dumps(body).encode("utf-8"), "application/json", headers)
+
+            def _send(self, status, payload, content_type, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--venues", type=int, default=200)
+    parser.add_argument("--horizon-days", type=int, default=365)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="share of API requests answered with 429")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    server = MockTicketmasterServer(args.events, args.venues, args.horizon_days, args.latency, args.rate_429,
+                                    args.host, args.port)
+    print(f"Mock Discovery API serving {args.events} events at {server.api_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""Run the sync cron hourly, as the refresh tiers expect.
+
+The cron record is ``noupdate``, so an upgrade keeps the former 5-hour
+interval. Only a cron still on that default is changed; a schedule set by
+hand is left alone.
+"""
+
+
+def migrate(cr, version):
+    cr.execute("""
+        UPDATE ir_cron
+           SET interval_number = 1
+         WHERE id IN (SELECT res_id
+                        FROM ir_model_data
+                       WHERE model = 'ir.cron'
+                         AND name = 'ir_cron_nyc_events_sync_5h')
+           AND interval_number = 5
+           AND interval_type = 'hours'
+    """)
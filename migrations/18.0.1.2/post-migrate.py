@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""Deactivate the shard worker crons unless shard mode is in use.
+
+The workers now ship inactive, but their records are ``noupdate``, so an
+upgrade keeps them active and waking every hour for nothing. Databases that
+set ``ticketmaster.shard_by`` keep their workers as they are.
+"""
+
+
+def migrate(cr, version):
+    cr.execute("SELECT value FROM ir_config_parameter WHERE key = 'ticketmaster.shard_by'")
+    row = cr.fetchone()
+    if row and row[0] in ("window", "segment"):
+        return
+    cr.execute("""
+        UPDATE ir_cron
+           SET active = FALSE
+         WHERE id IN (SELECT res_id
+                        FROM ir_model_data
+                       WHERE model = 'ir.cron'
+                         AND name IN ('ir_cron_nyc_events_shard_worker_1', 'ir_cron_nyc_events_shard_worker_2',
+                                      'ir_cron_nyc_events_shard_worker_3', 'ir_cron_nyc_events_shard_worker_4'))
+    """)
@@ -1,3 +1,8 @@
 # -*- coding: utf-8 -*-
 from . import res_config_settings
 from . import nyc_events_sync
+from . import nyc_events_sync_state
+from . import nyc_events_sync_run
+from . import nyc_events_sync_quota
+from . import nyc_events_sync_profile
+from . import nyc_events_sync_shard
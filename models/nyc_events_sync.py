@@ -1,14 +1,72 @@
 # -*- coding: utf-8 -*-
+import base64
+import hashlib
+import json
 import logging
 from datetime import datetime, timedelta, timezone
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
 
-from odoo import api, fields, models, _
+from odoo import api, fields, models, tools, _
 from odoo.tools import html_sanitize
 
+from .sync_engine import OPTIONAL_STAGES, TIER_SLACK, RefreshTier, SyncEngine
+from .ticketmaster_client import (
+    RETRY_STATUSES, PooledSession, QuotaBudget, QuotaExhausted, TokenBucket, WindowCrawler, bump, retry_delay,
+)
+
 _logger = logging.getLogger(__name__)
 TICKETMASTER_API = "https://app.ticketmaster.com/discovery/v2"
+TM_PAGE_SIZE = 200                  # Discovery API maximum page size
+TM_MAX_DEPTH = 1000                 # Discovery API rejects page * size >= 1000
+TM_HORIZON_DAYS = 365               # How far ahead the crawl looks by default
+TM_MIN_WINDOW = timedelta(hours=1)  # Windows are never split below this span
+TM_RATE_LIMIT = 5                   # Requests per second allowed by Ticketmaster
+TM_FETCH_WORKERS = 4                # Concurrent page fetches
+TM_DAILY_QUOTA = 5000               # Ticketmaster calls allowed per day (free tier)
+TM_QUOTA_RESERVE = 500              # Calls kept for event pages once the budget runs low
+TM_QUOTA_BLOCK = 20                 # Calls claimed from the shared daily counter at a time
+TM_MAX_RETRIES = 4                  # Retries per request on 429 / 5xx / connection errors
+TM_BACKOFF_BASE = 1.0               # Seconds before the first retry (doubles each time)
+TM_BACKOFF_CAP = 60.0               # Longest single wait between retries
+TM_HTTP_POOL_HOSTS = 4              # Distinct hosts kept in the HTTP pool (API + image CDNs)
+TM_HTTP_POOL_SIZE = 8               # Keep-alive connections per host
+TM_IMAGE_WORKERS = 8                # Concurrent image downloads
+TM_IMAGE_TIMEOUT = 30               # Seconds before one image download is abandoned
+TM_IMAGE_CONNECT_TIMEOUT = 5        # Seconds to reach an image host (a dead host fails fast)
+TM_IMAGE_RETRIES = 0                # Image downloads are not retried in the run: the next run retries them
+TM_IMAGE_WRITE_BATCH = 50           # Downloaded images written back per flush
+TM_LOOKUP_CHUNK = 1000              # Ticketmaster ids per existence lookup query
+TM_CREATE_BATCH = 200               # New events per multi-row create
+TM_STALE_LOOKUPS = 200              # Stale candidates per window confirmed by id before they are retired
+TM_COMMIT_CHUNK = 500               # Events committed per transaction
+TM_FINGERPRINT_VERSION = 3          # Bump when the payload -> vals mapping changes
+TM_DEFAULT_QUERY = {"city": "New York", "countryCode": "US"}  # Search used when no sync profile is active
+TM_SYNC_LOCK = "nyc_events_sync"    # Advisory lock name serializing sync runs across workers
+TM_REQUEUE_DELAY = timedelta(minutes=5)  # Retry delay for a queued run that found a sync in progress
+TM_SHARD_WINDOWS = 8                # Date-window shards per refresh tier in window shard mode
+TM_SHARD_LEASE = timedelta(minutes=30)  # A running shard whose checkpoint is older was abandoned
+TM_SHARD_WORKER_BUDGET = 600        # Seconds a shard worker keeps claiming shards before handing over
+# Discovery API segments for segment shard mode (Music, Sports, Arts & Theatre, Film, Miscellaneous, Undefined)
+TM_SEGMENTS = (
+    "KZFzniwnSyZfZ7v7nJ", "KZFzniwnSyZfZ7v7nE", "KZFzniwnSyZfZ7v7na",
+    "KZFzniwnSyZfZ7v7nn", "KZFzniwnSyZfZ7v7n1", "KZFzniwnSyZfZ7v7l1",
+)
+# Refresh tiers as (name, window end in hours from now, refresh interval in hours); each window
+# starts where the previous one ends and the last one (no end) runs to the horizon
+TM_REFRESH_TIERS = (
+    ("imminent", 48, 1),
+    ("upcoming", 24 * 30, 24),
+    ("distant", None, 24 * 7),
+)
+
+# One bucket per Odoo process so every sync thread shares the same ceiling
+TM_RATE_LIMITER = TokenBucket(TM_RATE_LIMIT)
+# One pooled HTTP session per Odoo process, rebuilt when its pool settings change
+_TM_SESSION = None
+_TM_SESSION_LOCK = threading.Lock()
 
 # -----------------------------
 # Extend event.event (minimal)
@@ -24,6 +82,57 @@ class EventEvent(models.Model):
     event_category = fields.Char(string="Event Category")
     venue_name = fields.Char(string="Venue Name")
     image_1920 = fields.Image("Image", max_width=1920, max_height=1920)
+    ticketmaster_image_url = fields.Char(string="Image Source URL", copy=False)
+    ticketmaster_image_checksum = fields.Char(string="Image Checksum", copy=False)
+    ticketmaster_payload_hash = fields.Char(string="Payload Fingerprint", copy=False)
+    ticketmaster_profile_id = fields.Many2one("nyc.events.sync.profile", string="Sync Profile", index=True,
+                                              ondelete="set null", copy=False)
+
+
+class ResPartner(models.Model):
+    _inherit = "res.partner"
+
+    ticketmaster_venue_id = fields.Char(string="Ticketmaster Venue ID", index=True, copy=False)
+
+
+class ResCountry(models.Model):
+    _inherit = "res.country"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env.registry.clear_cache()  # drop the sync's country/state lookup table
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
+
+class ResCountryState(models.Model):
+    _inherit = "res.country.state"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env.registry.clear_cache()  # drop the sync's country/state lookup table
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
 
 # --------------------------------
 # Sync service (cron + manual run)
@@ -34,128 +143,596 @@ class NYCEventsSync(models.TransientModel):
 
     # Manual fetch button hook (used by Settings server action)
     def action_fetch_all_events(self):
+        """Queue a sync for the cron worker and return at once.
+
+        The crawl can outlast the HTTP worker's time limit, so the button
+        only records a queued run and triggers the sync cron right away;
+        the user who clicked gets progress notifications from the run.
+        """
         self.ensure_one()
-        result = self._fetch_nyc_events()
+        ICP = self.env["ir.config_parameter"].sudo()
+        if not ICP.get_param("ticketmaster.api_key"):
+            title, kind = "Error: No Ticketmaster API key found. Please enter your Ticketmaster API key first.", "danger"
+        elif self.env["nyc.events.sync.run"]._next_queued():
+            title, kind = "A Ticketmaster sync is already queued. It starts in a moment.", "warning"
+        else:
+            self.env["nyc.events.sync.run"].sudo().create({
+                "trigger": "manual",
+                "state": "queued",
+                "user_id": self.env.uid,
+            })
+            self._sync_cron()._trigger()
+            title, kind = "Ticketmaster sync started in the background. Progress will be notified here.", "info"
         return {
             "type": "ir.actions.client",
             "tag": "display_notification",
-            "params": {"title": result, "type": "success"},
+            "params": {"title": title, "type": kind},
         }
 
     @api.model
     def cron_sync_nyc_events(self):
         self._sync_nyc_events()
 
-    # -------------- NYC Events Fetch --------------
-    def _fetch_nyc_events(self):
-        """Fetch all NYC events from Ticketmaster Discovery API"""
-        ICP = self.env["ir.config_parameter"].sudo()
-        api_key = ICP.get_param("ticketmaster.api_key")
-        if not api_key:
-            return "Error: No Ticketmaster API key found. Please enter your Ticketmaster API key first."
-
-        try:
-            # Fetch all NYC events from Ticketmaster
-            events = self._fetch_ticketmaster_events(api_key)
-            
-            # Store settings for future use
-            ICP.set_param("ticketmaster.auto_publish", "1")
-            ICP.set_param("ticketmaster.restrict_only_api_events", "1")
-            
-            created, updated, skipped = 0, 0, 0
-            for event in events:
-                try:
-                    res = self._upsert_ticketmaster_event(event, True, False, api_key)  # Auto-publish, no specific website
-                    if res == "created": created += 1
-                    elif res == "updated": updated += 1
-                    else: skipped += 1
-                except Exception as e:
-                    _logger.exception("Failed to upsert Ticketmaster event %s: %s", event.get("id"), str(e))
-                    # Rollback the current transaction to prevent cascade failures
-                    self.env.cr.rollback()
-                    continue
-            
-            # Unpublish non-Ticketmaster events
-            self._unpublish_non_ticketmaster_events(False)
-            
-            return f"Success! Found {len(events)} NYC events from Ticketmaster. Created: {created}, Updated: {updated}, Skipped: {skipped}"
-            
-        except Exception as e:
-            _logger.exception("Error in NYC events fetch")
-            return f"Error: {str(e)}"
+    def _sync_cron(self):
+        module = __name__.split(".")[2]
+        return self.env.ref(f"{module}.ir_cron_nyc_events_sync_5h").sudo()
 
     # -------------- Core Sync --------------
     @api.model
     def _sync_nyc_events(self):
+        """Cron entry point; carries out the run queued from the Settings first, if any"""
         ICP = self.env["ir.config_parameter"].sudo()
-        api_key = ICP.get_param("ticketmaster.api_key")
-        if not api_key:
+        queued = self.env["nyc.events.sync.run"]._next_queued()
+        if not ICP.get_param("ticketmaster.api_key"):
             _logger.warning("Ticketmaster API key missing; skipping sync.")
+            if queued:
+                queued.write({"state": "failed", "ended_at": fields.Datetime.now(),
+                              "error_message": "No Ticketmaster API key configured."})
             return
+        if self._shard_mode():
+            if self._shard_workers():
+                self._plan_sync_shards(queued)
+                return
+            _logger.warning("ticketmaster.shard_by is set but no shard worker cron is active; "
+                            "crawling in this process instead.")
+        engine = self._sync_engine(queued.trigger if queued else "cron", run_log=queued).run()
+        if engine.skipped and queued:
+            self._sync_cron()._trigger(fields.Datetime.now() + TM_REQUEUE_DELAY)
+
+    def _sync_engine(self, trigger, **overrides):
+        """Build the ``SyncEngine`` of one run from the Ticketmaster settings.
+
+        ``ticketmaster.sync_stages`` lists the optional stages to run
+        (default ``images,reconcile``); keyword arguments override any setting.
+        """
+        ICP = self.env["ir.config_parameter"].sudo()
+        settings = {
+            "api_key": ICP.get_param("ticketmaster.api_key"),
+            "auto_publish": ICP.get_param("ticketmaster.auto_publish", "1") == "1",
+            "website_id": int(ICP.get_param("ticketmaster.website_id", "0") or 0),
+            "restrict_only_api": ICP.get_param("ticketmaster.restrict_only_api_events", "1") == "1",
+            "stages": self._sync_stages(),
+            "chunk_size": int(ICP.get_param("ticketmaster.commit_chunk_size", TM_COMMIT_CHUNK) or TM_COMMIT_CHUNK),
+            "label": "NYC Events Fetch" if trigger == "manual" else "NYC Events Sync",
+            "tiers": self._refresh_tiers(),
+            "profiles": self.env["nyc.events.sync.profile"].sudo().search([]),
+            # a fetch asked for by a user refreshes everything, due or not
+            "force_all": trigger == "manual",
+        }
+        settings.update(overrides)
+        return SyncEngine(self, trigger, **settings)
+
+    def _sync_stages(self):
+        ICP = self.env["ir.config_parameter"].sudo()
+        stages = ICP.get_param("ticketmaster.sync_stages", ",".join(OPTIONAL_STAGES))
+        return [stage.strip() for stage in stages.split(",") if stage.strip()]
+
+    # -------------- Sharded crawl --------------
+    def _shard_mode(self):
+        """``window`` or ``segment`` when ``ticketmaster.shard_by`` splits crawls into shard jobs, else False"""
+        mode = self.env["ir.config_parameter"].sudo().get_param("ticketmaster.shard_by", "")
+        return mode if mode in ("window", "segment") else False
 
-        auto_publish = ICP.get_param("ticketmaster.auto_publish", "1") == "1"
-        website_id = int(ICP.get_param("ticketmaster.website_id", "0") or 0)
-        restrict_only_api = ICP.get_param("ticketmaster.restrict_only_api_events", "1") == "1"
+    def _plan_sync_shards(self, queued=None):
+        """Split the due tiers into shards, queue them and wake the shard workers.
 
+        Planning takes the sync lock, so it never overlaps a single-process
+        run; while the shards of a crawl are unfinished no new crawl is
+        planned and the workers are woken again instead.
+        """
+        if not self._acquire_sync_lock():
+            _logger.info("Another Ticketmaster sync is running; not planning shards.")
+            return
         try:
-            # Fetch all NYC events from Ticketmaster
-            events = self._fetch_ticketmaster_events(api_key)
+            Run = self.env["nyc.events.sync.run"].sudo()
+            if Run.search_count([("state", "=", "running"), ("shard_ids", "!=", False)]):
+                _logger.info("A sharded Ticketmaster crawl is still running; waking its workers.")
+                self._trigger_shard_workers()
+                return
+            engine = self._sync_engine(queued.trigger if queued else "cron")
+            State = self.env["nyc.events.sync.state"]
+            now = fields.Datetime.now()
+            due = [tier for tier in engine.tiers
+                   if engine.force_all or State._get_state(tier.name)._is_due(tier.interval - TIER_SLACK, now)]
+            if not due:
+                return
+            run = queued or Run.create({"trigger": "cron"})
+            run.write({"state": "running", "started_at": now, "tiers": ", ".join(tier.name for tier in due)})
+            Shard = self.env["nyc.events.sync.shard"].sudo()
+            sequence = 0
+            for tier in due:
+                for start, end, segment_id in self._shard_slices(now + tier.start, now + tier.end):
+                    checkpoint = State.sudo().create({
+                        "name": f"shard-{run.id}-{sequence}",
+                        "state": "running",
+                        "window_start": start,
+                        "window_end": end,
+                        "resume_from": start,
+                        "started_at": now,
+                        "checkpoint_at": now,
+                    })
+                    Shard.create({
+                        "run_id": run.id,
+                        "sequence": sequence,
+                        "tier": tier.name,
+                        "segment_id": segment_id,
+                        "window_start": start,
+                        "window_end": end,
+                        "state_id": checkpoint.id,
+                    })
+                    sequence += 1
+            _logger.info("Planned %s Ticketmaster shards for tiers %s", sequence, run.tiers)
+            self._commit_progress()
+            self._trigger_shard_workers()
+        finally:
+            self._release_sync_lock()
 
-            created, updated, skipped = 0, 0, 0
-            for event in events:
-                try:
-                    res = self._upsert_ticketmaster_event(event, auto_publish, website_id, api_key)
-                    if res == "created": created += 1
-                    elif res == "updated": updated += 1
-                    else: skipped += 1
-                except Exception as e:
-                    _logger.exception("Failed to upsert Ticketmaster event %s: %s", event.get("id"), str(e))
-                    # Rollback the current transaction to prevent cascade failures
-                    self.env.cr.rollback()
-                    continue
+    def _shard_slices(self, start, end):
+        """``(start, end, segment id)`` slices of one tier window, per ``ticketmaster.shard_by``.
 
-            # Optionally unpublish non-Ticketmaster events so only API events show on site
-            if restrict_only_api:
-                self._unpublish_non_ticketmaster_events(website_id)
+        Segment shards rely on every event carrying one of the segments of
+        ``ticketmaster.shard_segments`` (``TM_SEGMENTS`` by default).
+        """
+        ICP = self.env["ir.config_parameter"].sudo()
+        if self._shard_mode() == "segment":
+            segments = ICP.get_param("ticketmaster.shard_segments") or ",".join(TM_SEGMENTS)
+            return [(start, end, segment.strip()) for segment in segments.split(",") if segment.strip()]
+        count = max(1, int(ICP.get_param("ticketmaster.shard_windows", TM_SHARD_WINDOWS) or TM_SHARD_WINDOWS))
+        bounds = [(start + (end - start) * index / count).replace(microsecond=0) for index in range(count)] + [end]
+        return [(bounds[index], bounds[index + 1], False) for index in range(count) if bounds[index] < bounds[index + 1]]
 
-            _logger.info("NYC Events Sync: created=%s updated=%s skipped=%s total=%s",
-                         created, updated, skipped, len(events))
-        except Exception as e:
-            _logger.exception("Error in NYC events sync")
+    def _shard_workers(self):
+        """Active shard worker crons (they ship inactive: activate them for shard mode, duplicate one to add a worker)"""
+        return self.env["ir.cron"].sudo().search([
+            ("model_id.model", "=", self._name), ("code", "=", "model.cron_run_sync_shards()"),
+        ])
+
+    def _trigger_shard_workers(self):
+        for worker in self._shard_workers():
+            worker._trigger()
+
+    @api.model
+    def cron_run_sync_shards(self):
+        """Shard worker: run claimed shards one after the other, then merge finished crawls"""
+        started = time.monotonic()
+        Shard = self.env["nyc.events.sync.shard"]
+        while True:
+            if time.monotonic() - started > TM_SHARD_WORKER_BUDGET:
+                # hand over to a fresh job rather than running into the cron time limit
+                self._trigger_shard_workers()
+                return
+            shard = Shard._claim(TM_SHARD_LEASE)
+            if not shard or not self._run_sync_shard(shard):
+                break
+        self._merge_sync_shards()
+
+    def _run_sync_shard(self, shard):
+        """Crawl one claimed shard; returns False once the daily quota is spent"""
+        shard.write({"state": "running", "attempts": shard.attempts + 1})
+        shard.state_id.checkpoint_at = fields.Datetime.now()  # renew the lease
+        shard_run = self.env["nyc.events.sync.run"].sudo().create({
+            "trigger": "shard",
+            "state": "running",  # never queued: the sync cron would take it for a Settings request
+            "parent_id": shard.run_id.id,
+            "tiers": shard.tier,
+        })
+        self._commit_progress()
+
+        now = fields.Datetime.now()
+        tier = RefreshTier(shard.tier, shard.window_start - now, shard.window_end - now, timedelta(0))
+        engine = self._sync_engine(
+            "shard",
+            run_log=shard_run,
+            label=f"NYC Events Shard {shard.id}",
+            tiers=[tier],
+            force_all=True,
+            states={shard.tier: shard.state_id},
+            segment_id=shard.segment_id,
+            stages=[stage for stage in self._sync_stages() if stage != "reconcile"],  # done by the merge
+            use_lock=False,
+        ).run()
+
+        vals = {
+            "seen_ids": "\n".join(sorted(shard._seen_id_set() | set(engine.seen_ids))),
+            "truncated": shard.truncated or bool(engine.stats.get("truncated_windows")),
+        }
+        if engine.error:
+            vals.update(state="failed", error_message=str(engine.error))
+        elif engine.stats.get("crawl_complete"):
+            vals["state"] = "done"
+        else:
+            vals["state"] = "pending"  # cut short by the quota: resumes from its checkpoint
+        shard.write(vals)
+        self._commit_progress()
+        shards = shard.run_id.shard_ids
+        shard.run_id._notify_requester(
+            f"{len(shards.filtered(lambda s: s.state in ('done', 'failed')))}/{len(shards)} shards crawled")
+        return not engine.stats.get("quota_exhausted")
+
+    def _merge_sync_shards(self):
+        """Final step of sharded crawls whose shards all finished: reconcile and close the run.
+
+        The run row is locked with ``SKIP LOCKED`` so only one worker merges it.
+        """
+        Run = self.env["nyc.events.sync.run"].sudo()
+        for run in Run.search([("state", "=", "running"), ("shard_ids", "!=", False)]):
+            if run.shard_ids.filtered(lambda shard: shard.state in ("pending", "running")):
+                continue
+            self.env.cr.execute("""
+                SELECT id FROM nyc_events_sync_run WHERE id = %s AND state = 'running' FOR UPDATE SKIP LOCKED
+            """, [run.id])
+            if not self.env.cr.fetchone():
+                continue
+            self._merge_sync_shard_run(run)
+
+    def _merge_sync_shard_run(self, run):
+        engine = self._sync_engine(run.trigger)  # settings and quota for the stale lookups, the engine is not run
+        self._http_configure()
+        engine._start_quota()
+        stats = run._sum_shard_runs()
+        started = time.monotonic()
+        complete = True
+        State = self.env["nyc.events.sync.state"]
+        for tier in run.tiers.split(", "):
+            shards = run.shard_ids.filtered(lambda shard: shard.tier == tier)
+            if not shards or shards.filtered(lambda shard: shard.state != "done"):
+                complete = False  # the tier stays due and is planned again
+                continue
+            window_start, window_end = min(shards.mapped("window_start")), max(shards.mapped("window_end"))
+            if shards.filtered("truncated"):
+                _logger.info("Skipping stale event reconciliation of %s: the crawl was truncated", tier)
+            elif "reconcile" in engine.stages:
+                stats["stale"] += self._retire_stale_ticketmaster_events(
+                    shards._seen_id_set(), window_start, window_end, engine)
+            State._get_state(tier).write({
+                "state": "done",
+                "window_start": window_start,
+                "window_end": window_end,
+                "resume_from": window_end,
+                "started_at": run.started_at,
+                "checkpoint_at": fields.Datetime.now(),
+                "last_crawled": run.started_at,
+            })
+        if "reconcile" in engine.stages and engine.restrict_only_api:
+            self._unpublish_non_ticketmaster_websites(engine.profiles.values(), engine.website_id)
+        stats["timings"]["unpublish"] += time.monotonic() - started
+        stats["crawl_complete"] = complete
+        # stale lookups, and the updates of events found rescheduled
+        engine.flush_quota()
+        for key, value in engine.counts.items():
+            stats[key] = stats.get(key, 0) + value
+        stats["api_calls"] += engine.stats.get("api_calls", 0)
+        stats.update(quota_used=engine.stats["quota_used"], quota_remaining=engine.stats["quota_remaining"])
+
+        run.shard_ids.mapped("state_id").unlink()
+        run.shard_ids.write({"seen_ids": False})
+        run._update_from_stats(stats, state="done", ended_at=fields.Datetime.now(),
+                               progress=100.0 if complete else run.progress)
+        self._commit_progress()
+        self._log_sync_stats(f"NYC Events Sync (sharded run {run.id})", stats)
+        run._notify_requester(
+            f"Success! Found {stats['events']} NYC events from Ticketmaster in {len(run.shard_ids)} shards. "
+            f"Created: {stats['created']}, Updated: {stats['updated']}, Unchanged: {stats['unchanged']}, "
+            f"Skipped: {stats['skipped']}", "success")
 
     # -------------- Ticketmaster Fetchers --------------
-    def _fetch_ticketmaster_events(self, api_key):
-        """Fetch NYC events from Ticketmaster Discovery API (limited to 10 for testing)"""
-        events = []
-        page = 0
-        size = 10  # Limit to 10 events for testing
-        
+    def _ticketmaster_crawler(self, api_key, stats=None, window_start=None, window_end=None, quota=None,
+                              queries=None):
+        """Return a ``WindowCrawler`` streaming every event page of the window.
+
+        ``queries`` maps a crawler scope (a sync profile id) to its search
+        parameters; without it the crawl uses ``TM_DEFAULT_QUERY`` (NYC).
+        All scopes share the fetch pool, the rate limiter and the quota.
+
+        The Discovery API refuses to page past ``page * size >= 1000``, so the
+        query is split into ``startDateTime``/``endDateTime`` windows. A window
+        whose first page reports more than ``TM_MAX_DEPTH`` events is halved
+        until each window fits, then all of its pages are walked.
+
+        Pages are fetched by a bounded thread pool and handed over as they
+        arrive; the process-wide ``TM_RATE_LIMITER`` keeps the pool under
+        Ticketmaster's 5 req/s. Worker threads only do HTTP, never ORM work.
+        Every page spends one call of ``quota`` when one is given.
+        """
+        ICP = self.env["ir.config_parameter"].sudo()
+        if not window_start or not window_end:
+            window_start, window_end = self._ticketmaster_crawl_window()
+        workers = int(ICP.get_param("ticketmaster.fetch_workers", TM_FETCH_WORKERS) or TM_FETCH_WORKERS)
+
+        api_url = self._ticketmaster_api_url()
+        queries = queries or {None: TM_DEFAULT_QUERY}
+
+        def fetch_page(scope, start, end, page):
+            return self._fetch_ticketmaster_page(api_key, start, end, page, stats, api_url, quota, queries[scope])
+
+        return WindowCrawler(fetch_page, window_start, window_end, TM_PAGE_SIZE, TM_MAX_DEPTH, TM_MIN_WINDOW,
+                             workers=workers, stats=stats, scopes=list(queries))
+
+    def _ticketmaster_default_query(self):
+        return dict(TM_DEFAULT_QUERY)
+
+    def _fetch_ticketmaster_page(self, api_key, start, end, page, stats=None, api_url=TICKETMASTER_API, quota=None,
+                                 query=None):
+        """Fetch a single page of events matching ``query`` (NYC by default) starting inside ``[start, end)``.
+
+        Raises ``QuotaExhausted`` when ``quota`` has no call left for it.
+        """
         params = {
             "apikey": api_key,
-            "city": "New York",
-            "countryCode": "US",
-            "size": size,
-            "page": page
+            **(query or TM_DEFAULT_QUERY),
+            "startDateTime": self._format_ticketmaster_date(start),
+            "endDateTime": self._format_ticketmaster_date(end),
+            "sort": "date,asc",
+            "size": TM_PAGE_SIZE,
+            "page": page,
         }
-        
-        url = f"{TICKETMASTER_API}/events.json"
-        resp = requests.get(url, params=params, timeout=30)
-        self._rate_limit_guard(resp)
-        data = resp.json()
-        
-        page_events = data.get("_embedded", {}).get("events", [])
-        events.extend(page_events)
-                
-        _logger.info(f"Fetched {len(events)} events from Ticketmaster (limited to 10 for testing)")
-        return events
+        url = f"{api_url}/events.json"
+        return self._ticketmaster_get(url, params, stats, quota, QuotaBudget.PAGE).json()
+
+    def _ticketmaster_get(self, url, params=None, stats=None, quota=None, priority=QuotaBudget.PAGE,
+                          api_call=True, timeout=30, max_retries=None):
+        """GET with retries; the single HTTP path of the sync (safe in worker threads).
+
+        Rate limiting (429), server errors and connection failures are
+        retried up to ``ticketmaster.max_retries`` times, waiting as told by
+        ``Retry-After``/Ticketmaster's rate-limit headers or with jittered,
+        capped exponential backoff. A 429 pauses the shared rate limiter so
+        every fetcher backs off together. Each attempt of an ``api_call``
+        spends one call of ``quota`` and a rate-limiter token; image CDN
+        downloads pass ``api_call=False``. ``max_retries`` overrides the
+        configured retry count.
+        """
+        session = self._http()
+        configured_retries, backoff_base, backoff_cap = session.retry_settings
+        max_retries = configured_retries if max_retries is None else max_retries
+        for attempt in range(max_retries + 1):
+            last_attempt = attempt == max_retries
+            if api_call:
+                if quota:
+                    quota.acquire(priority)
+                TM_RATE_LIMITER.acquire()
+            try:
+                resp = session.get(url, params=params, timeout=timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if last_attempt:
+                    raise
+                delay = retry_delay({}, attempt, backoff_base, backoff_cap)
+                _logger.warning("Request to %s failed (%s); retry %s in %.1fs", url, e, attempt + 1, delay)
+                bump(stats, "retries")
+                time.sleep(delay)
+                continue
+            if api_call:
+                bump(stats, "api_calls")
+            bump(stats, "bytes_downloaded", len(resp.content))
+            if resp.status_code not in RETRY_STATUSES or last_attempt:
+                self._rate_limit_guard(resp)
+                return resp
+            delay = retry_delay(resp.headers, attempt, backoff_base, backoff_cap)
+            _logger.warning("Ticketmaster %s on %s; retry %s in %.1fs", resp.status_code, url, attempt + 1, delay)
+            bump(stats, "retries")
+            if resp.status_code == 429 and api_call:
+                TM_RATE_LIMITER.pause(delay)
+            else:
+                time.sleep(delay)
+
+    # -------------- Sync lock --------------
+    def _acquire_sync_lock(self):
+        """Take the session-level advisory lock serializing sync runs.
+
+        A session lock, unlike ``pg_try_advisory_xact_lock``, survives the
+        chunk commits of the run; it is released by ``_release_sync_lock``
+        or, if the worker dies, when its database connection closes.
+        Returns False at once when another run holds it.
+        """
+        self.env.cr.execute("SELECT pg_try_advisory_lock(hashtext(%s))", [TM_SYNC_LOCK])
+        return self.env.cr.fetchone()[0]
+
+    def _release_sync_lock(self):
+        self.env.cr.execute("SELECT pg_advisory_unlock(hashtext(%s))", [TM_SYNC_LOCK])
+
+    # -------------- Daily API quota --------------
+    def _ticketmaster_quota(self):
+        """Return a ``QuotaBudget`` drawing from today's shared call counter, and that (UTC) day"""
+        ICP = self.env["ir.config_parameter"].sudo()
+        limit = int(ICP.get_param("ticketmaster.daily_quota", TM_DAILY_QUOTA) or TM_DAILY_QUOTA)
+        reserve = int(ICP.get_param("ticketmaster.quota_reserve", TM_QUOTA_RESERVE) or TM_QUOTA_RESERVE)
+        day = datetime.now(timezone.utc).date()
+        Quota = self.env["nyc.events.sync.quota"]
+        return QuotaBudget(limit, used=Quota._calls_today(day), reserve=reserve, claim=Quota._claimer(day, limit),
+                           block=TM_QUOTA_BLOCK), day
+
+    def _ticketmaster_rate_limit(self):
+        """Requests per second this process may send.
+
+        ``TM_RATE_LIMITER`` only holds back the threads of one process, and
+        each shard worker is a process of its own (prefork), so in shard
+        mode ``ticketmaster.rate_limit`` is split evenly between the shard
+        workers that can run at once: the active worker crons, but no more
+        than the ``max_cron_threads`` of the server.
+        """
+        ICP = self.env["ir.config_parameter"].sudo()
+        rate = float(ICP.get_param("ticketmaster.rate_limit", TM_RATE_LIMIT) or TM_RATE_LIMIT)
+        if self._shard_mode():
+            rate /= max(1, min(len(self._shard_workers()), tools.config["max_cron_threads"]))
+        return rate
+
+    # -------------- Crawl window & commits --------------
+    def _ticketmaster_crawl_window(self):
+        """Return the default ``(start, end)`` crawl window as aware UTC datetimes"""
+        ICP = self.env["ir.config_parameter"].sudo()
+        horizon_days = int(ICP.get_param("ticketmaster.horizon_days", TM_HORIZON_DAYS) or TM_HORIZON_DAYS)
+        window_start = datetime.now(timezone.utc).replace(microsecond=0)
+        return window_start, window_start + timedelta(days=horizon_days)
+
+    def _refresh_tiers(self):
+        """Return the ``RefreshTier`` list covering the crawl horizon, nearest first.
+
+        Events starting soon change most (cancellations, sell-outs) and are
+        refreshed often; far-future ones rarely. ``ticketmaster.refresh_tiers``
+        overrides ``TM_REFRESH_TIERS`` as ``name:end_hours:interval_hours``
+        items separated by commas, e.g. ``imminent:48:1,upcoming:720:24,distant::168``.
+        """
+        ICP = self.env["ir.config_parameter"].sudo()
+        horizon_days = int(ICP.get_param("ticketmaster.horizon_days", TM_HORIZON_DAYS) or TM_HORIZON_DAYS)
+        horizon = timedelta(days=horizon_days)
+        spec = ICP.get_param("ticketmaster.refresh_tiers")
+        rows = TM_REFRESH_TIERS
+        if spec:
+            rows = []
+            for item in spec.split(","):
+                name, end_hours, interval_hours = (part.strip() for part in item.split(":"))
+                rows.append((name, float(end_hours) if end_hours else None, float(interval_hours)))
+        tiers = []
+        start = timedelta(0)
+        for name, end_hours, interval_hours in rows:
+            end = min(timedelta(hours=end_hours), horizon) if end_hours else horizon
+            if end > start:
+                tiers.append(RefreshTier(name, start, end, timedelta(hours=interval_hours)))
+                start = end
+        return tiers
+
+    def _commit_progress(self):
+        """Commit the work done so far (never inside tests, which own the transaction)"""
+        if getattr(threading.current_thread(), "testing", False):
+            self.env.flush_all()
+            return
+        self.env.cr.commit()
 
     # -------------- UPSERT Ticketmaster Events --------------
-    def _upsert_ticketmaster_event(self, tm_event, auto_publish, website_id, api_key):
-        Event = self.env["event.event"].sudo()
+    def _upsert_ticketmaster_events(self, events, engine, image_jobs=None, profile=None):
+        """Upsert stage: update existing events in place and create new ones in batches.
+
+        ``events`` all come from the sync ``profile`` (if any), which gives
+        them their website.
+
+        Every event (and every create batch) runs in its own savepoint, so a
+        failure discards only its own work. Failed events are retried once at
+        the end of the stage; ids that still fail end up in
+        ``engine.failed_ids``.
+
+        Returns ``{"created": n, "updated": n, "unchanged": n, "skipped": n, "failed": n}``.
+        """
+        ICP = self.env["ir.config_parameter"].sudo()
+        batch_size = int(ICP.get_param("ticketmaster.create_batch_size", TM_CREATE_BATCH) or TM_CREATE_BATCH)
+        counts = {"created": 0, "updated": 0, "unchanged": 0, "skipped": 0, "failed": 0}
+        existing_map = self._map_existing_events(event.get("id") for event in events)
+        create_queue = {}
+        failed = {}
+        for event in events:
+            res = self._upsert_in_savepoint(event, engine, image_jobs, existing_map, create_queue, failed, profile)
+            if res not in ("queued", "failed"):
+                counts[res] += 1
+            if len(create_queue) >= batch_size:
+                counts["created"] += self._create_ticketmaster_events(create_queue, engine.stats, image_jobs,
+                                                                      existing_map, failed)
+        counts["created"] += self._create_ticketmaster_events(create_queue, engine.stats, image_jobs,
+                                                              existing_map, failed)
+
+        if failed:
+            _logger.info("Retrying %s failed Ticketmaster events", len(failed))
+            retry, failed = failed, {}
+            for event in retry.values():
+                res = self._upsert_in_savepoint(event, engine, image_jobs, existing_map, None, failed, profile)
+                if res != "failed":
+                    counts[res] += 1
+        if failed:
+            counts["failed"] = len(failed)
+            engine.failed_ids.extend(failed)
+            _logger.warning("Ticketmaster events still failing after retry: %s", ", ".join(failed))
+        return counts
+
+    def _upsert_in_savepoint(self, event, engine, image_jobs, existing_map, create_queue, failed, profile=None):
+        """Run one upsert inside a savepoint; on error record the payload in ``failed``"""
+        cached_venues = len(engine.venue_cache)
+        try:
+            with self.env.cr.savepoint():
+                return self._upsert_ticketmaster_event(event, engine, image_jobs, existing_map, create_queue, profile)
+        except Exception as e:
+            # the rollback undid the venue partners resolved in the savepoint: forget them
+            for cache_key in list(engine.venue_cache)[cached_venues:]:
+                del engine.venue_cache[cache_key]
+            _logger.exception("Failed to upsert Ticketmaster event %s: %s", event.get("id"), str(e))
+            if event.get("id"):
+                failed[event["id"]] = event
+            return "failed"
+
+    def _create_ticketmaster_events(self, create_queue, stats, image_jobs, existing_map, failed=None):
+        """Create every queued event with one multi-row ``create`` and empty the queue.
+
+        If the batch fails, its savepoint is rolled back and the events are
+        created one by one so a single bad row does not sink the others.
+        """
+        if not create_queue:
+            return 0
+        queued = list(create_queue.items())
+        create_queue.clear()
+        try:
+            with self.env.cr.savepoint():
+                records = self.env["event.event"].sudo().create([vals for _tm_id, (vals, *_rest) in queued])
+        except Exception as e:
+            if len(queued) > 1:
+                _logger.warning("Failed to create %s Ticketmaster events (%s); retrying one by one", len(queued), e)
+                return sum(self._create_ticketmaster_events({tm_id: item}, stats, image_jobs, existing_map, failed)
+                           for tm_id, item in queued)
+            _logger.exception("Failed to create Ticketmaster event %s: %s", queued[0][0], str(e))
+            if failed is not None:
+                failed[queued[0][0]] = queued[0][1][3]
+            return 0
+        for (tm_id, (_vals, image_url, fingerprint, _event)), rec in zip(queued, records):
+            existing_map[tm_id] = rec
+            if image_url:
+                self._queue_event_image(rec, image_url, stats, image_jobs, fingerprint)
+        return len(records)
+
+    def _upsert_ticketmaster_event(self, tm_event, engine, image_jobs=None, existing_map=None, create_queue=None,
+                                   profile=None):
+        """Create or update one event with the settings of ``engine``. Images are queued on ``image_jobs`` as
+        ``(event id, url, fingerprint)`` for ``_download_event_images``; without a queue
+        the image is downloaded right away. ``existing_map`` comes from
+        ``_map_existing_events`` and spares a search per event. New events
+        are put on ``create_queue`` (result ``"queued"``) when one is given.
+        Events whose payload fingerprint is unchanged are not written at all.
+
+        The fingerprint marks an event as fully synced, so it is only stored
+        once nothing is left to do: with an image to fetch it is written by
+        the image stage together with the image, and an image lookup
+        deferred by the quota leaves it empty so the next run tries again.
+        """
 
         tm_id = tm_event.get("id")
         if not tm_id:
             return "skipped"
+        auto_publish, website_id, stats = engine.auto_publish, engine.website_id, engine.stats
+        profile_id = profile.id if profile else False
+        if profile and profile.website_id:
+            website_id = profile.website_id.id
+
+        if existing_map is None:
+            existing_map = self._map_existing_events([tm_id])
+        existing = existing_map.get(tm_id)
+        fingerprint = self._ticketmaster_fingerprint(tm_event, auto_publish, website_id, profile_id)
+        if existing and existing.ticketmaster_payload_hash == fingerprint:
+            return "unchanged"
 
         # Extract event data from Ticketmaster format
         name = tm_event.get("name", "Event")
@@ -182,7 +759,10 @@ class NYCEventsSync(models.TransientModel):
         # Venue information
         venue = tm_event.get("_embedded", {}).get("venues", [{}])[0] if tm_event.get("_embedded", {}).get("venues") else {}
         venue_name = venue.get("name", "")
-        partner_id = self._get_or_create_venue_partner(venue_name, venue)
+        venue_started = time.monotonic()
+        partner_id = self._get_or_create_venue_partner(venue_name, venue, engine.venue_cache)
+        timings = stats.setdefault("timings", {})
+        timings["venue"] = timings.get("venue", 0.0) + time.monotonic() - venue_started
         
         # Event category/classification
         classifications = tm_event.get("classifications", [])
@@ -193,19 +773,13 @@ class NYCEventsSync(models.TransientModel):
             genre = classification.get("genre", {})
             event_category = f"{segment.get('name', '')} - {genre.get('name', '')}".strip(" -")
         
-        # Images - try dedicated images endpoint first, then fallback to main event data
-        image_url = self._get_event_image_url(api_key, tm_id)
-        
-        # Fallback: try to get image from main event data if dedicated endpoint fails
-        if not image_url:
-            images = tm_event.get("images", [])
-            if images:
-                # Get the largest image from main event data
-                best_image = max(images, key=lambda x: x.get("width", 0) * x.get("height", 0))
-                image_url = best_image.get("url")
-                _logger.info("Using fallback image from main event data: %s", image_url)
-
-        existing = Event.search([("ticketmaster_id", "=", tm_id)], limit=1)
+        # Images - embedded search payload first, dedicated endpoint only when needed
+        image_url, image_deferred = None, False
+        if engine.images:
+            try:
+                image_url = self._select_event_image_url(tm_event, engine.api_key, stats, engine.quota)
+            except QuotaExhausted:
+                image_deferred = True
 
         vals = {
             "name": name,
@@ -215,7 +789,12 @@ class NYCEventsSync(models.TransientModel):
             "ticketmaster_status": status,
             "event_category": event_category,
             "venue_name": venue_name,
+            "last_synced_at": fields.Datetime.now(),
+            "ticketmaster_profile_id": profile_id,
         }
+        if engine.images:
+            # without the image stage the event is not fully synced: keep it out of the unchanged shortcut
+            vals["ticketmaster_payload_hash"] = False if image_url or image_deferred else fingerprint
         if partner_id:
             vals["address_id"] = partner_id
         if website_id:
@@ -225,37 +804,117 @@ class NYCEventsSync(models.TransientModel):
         unpublish_flag = status in ("cancelled", "postponed")
 
         if existing:
-            existing.write(vals)
-            if image_url:
-                self._set_event_image(existing, image_url)
-            # publish/unpublish
+            # publish/unpublish in the same write as the data; events retired as
+            # stale come back once they reappear in the feed
             if publish_flag:
-                existing.website_published = True
+                vals["website_published"] = True
             if unpublish_flag:
-                existing.website_published = False
-                existing.active = False
-            existing.last_synced_at = fields.Datetime.now()
-            return "updated"
-        else:
-            vals.update({
-                "ticketmaster_id": tm_id,
-                "last_synced_at": fields.Datetime.now(),
-                "website_published": publish_flag,
-            })
-            rec = Event.create(vals)
+                vals.update(website_published=False, active=False)
+            elif not existing.active:
+                vals["active"] = True
+            existing.write(vals)
             if image_url:
-                self._set_event_image(rec, image_url)
-            if unpublish_flag:
-                rec.website_published = False
-                rec.active = False
-            return "created"
+                self._queue_event_image(existing, image_url, stats, image_jobs, fingerprint)
+            return "updated"
+
+        vals.update({
+            "ticketmaster_id": tm_id,
+            "website_published": publish_flag and not unpublish_flag,
+            "active": not unpublish_flag,
+        })
+        if create_queue is not None:
+            duplicate = tm_id in create_queue
+            # Same event listed twice in one run: keep the latest payload
+            create_queue[tm_id] = (vals, image_url, fingerprint, tm_event)
+            return "skipped" if duplicate else "queued"
+        rec = self.env["event.event"].sudo().create(vals)
+        existing_map[tm_id] = rec
+        if image_url:
+            self._queue_event_image(rec, image_url, stats, image_jobs, fingerprint)
+        return "created"
 
     # -------------- Helpers --------------
+    def _ticketmaster_fingerprint(self, tm_event, auto_publish, website_id, profile_id=False):
+        """Hash of the payload fields the sync writes plus the settings that shape the written vals.
+
+        Only what feeds the write is hashed: parts of the payload the sync
+        never reads (price ranges, sales, links, the ``upcomingEvents``
+        counters of the venue) change all the time and must not make an
+        event look changed.
+        """
+        dates = tm_event.get("dates", {})
+        venue = (tm_event.get("_embedded", {}).get("venues") or [{}])[0]
+        classification = (tm_event.get("classifications") or [{}])[0]
+        images = tm_event.get("images", [])
+        inputs = {
+            "name": tm_event.get("name"),
+            "start": dates.get("start", {}).get("dateTime"),
+            "end": dates.get("end", {}).get("dateTime"),
+            "status": dates.get("status", {}).get("code"),
+            "url": tm_event.get("url"),
+            "venue": {key: venue.get(key) for key in ("id", "name", "address", "city", "postalCode", "state",
+                                                       "country", "location")},
+            "segment": classification.get("segment", {}).get("name"),
+            "genre": classification.get("genre", {}).get("name"),
+            "image": [self._best_image_url(images), self._best_image_url(images, allow_fallback=True)],
+        }
+        normalized = json.dumps(
+            [TM_FINGERPRINT_VERSION, bool(auto_publish), website_id or 0, profile_id or 0, inputs],
+            sort_keys=True, separators=(",", ":"), default=str,
+        )
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+    def _map_existing_events(self, tm_ids):
+        """Return ``{ticketmaster_id: event}`` for the given ids, archived events included.
+
+        Ids are resolved with chunked ``IN`` queries instead of one search per event.
+        """
+        Event = self.env["event.event"].sudo().with_context(active_test=False)
+        tm_ids = list({tm_id for tm_id in tm_ids if tm_id})
+        existing_map = {}
+        for offset in range(0, len(tm_ids), TM_LOOKUP_CHUNK):
+            chunk = tm_ids[offset:offset + TM_LOOKUP_CHUNK]
+            for event in Event.search([("ticketmaster_id", "in", chunk)], order="id"):
+                existing_map.setdefault(event.ticketmaster_id, event)
+        return existing_map
+
+    def _http(self):
+        """Return the process-wide pooled session used for every outbound call.
+
+        Settings are read once per sync run by ``_http_configure``; worker
+        threads only ever call this getter.
+        """
+        return _TM_SESSION or self._http_configure()
+
+    def _http_configure(self):
+        global _TM_SESSION
+        ICP = self.env["ir.config_parameter"].sudo()
+        pool_hosts = int(ICP.get_param("ticketmaster.http_pool_hosts", TM_HTTP_POOL_HOSTS) or TM_HTTP_POOL_HOSTS)
+        pool_size = int(ICP.get_param("ticketmaster.http_pool_size", TM_HTTP_POOL_SIZE) or TM_HTTP_POOL_SIZE)
+        with _TM_SESSION_LOCK:
+            session = _TM_SESSION
+            if not session or (session.pool_hosts, session.pool_size) != (pool_hosts, pool_size):
+                if session:
+                    session.close()
+                _TM_SESSION = session = PooledSession(pool_hosts=pool_hosts, pool_size=pool_size)
+            session.retry_settings = (
+                int(ICP.get_param("ticketmaster.max_retries", TM_MAX_RETRIES) or 0),
+                float(ICP.get_param("ticketmaster.backoff_base", TM_BACKOFF_BASE) or TM_BACKOFF_BASE),
+                float(ICP.get_param("ticketmaster.backoff_cap", TM_BACKOFF_CAP) or TM_BACKOFF_CAP),
+            )
+        TM_RATE_LIMITER.set_rate(self._ticketmaster_rate_limit())
+        return session
+
+    def _http_report(self, snapshot, stats):
+        """Store requests / new connections / reused connections since ``snapshot``"""
+        requests_made, opened = self._http().snapshot()
+        stats["http_requests"] = requests_made - snapshot[0]
+        stats["http_connections"] = opened - snapshot[1]
+        stats["http_reused"] = max(stats["http_requests"] - stats["http_connections"], 0)
+        return stats
+
     def _rate_limit_guard(self, resp):
-        if resp.status_code == 429:
-            _logger.warning("Ticketmaster 429 rate limited; sleeping 5s...")
-            time.sleep(5)
-            return
+        """Raise for responses that are not worth (or no longer worth) retrying"""
         if resp.status_code == 400:
             _logger.error("Ticketmaster 400 Bad Request. Response: %s", resp.text)
             raise requests.exceptions.HTTPError(f"400 Bad Request: {resp.text}")
@@ -272,60 +931,163 @@ class NYCEventsSync(models.TransientModel):
         except Exception:
             return fields.Datetime.now()
 
-    def _get_or_create_venue_partner(self, name, venue_data):
+    def _ticketmaster_api_url(self):
+        """Discovery API base URL; ``ticketmaster.api_url`` points the sync at a stand-in server"""
+        ICP = self.env["ir.config_parameter"].sudo()
+        return (ICP.get_param("ticketmaster.api_url") or TICKETMASTER_API).rstrip("/")
+
+    def _format_ticketmaster_date(self, dt):
+        """Format an aware UTC datetime the way Discovery API filters expect"""
+        return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def _get_or_create_venue_partner(self, name, venue_data, venue_cache=None):
+        """Resolve the venue partner, matching on the Ticketmaster venue id first.
+
+        ``venue_cache`` maps venue ids (or names for venues without an id) to
+        partner ids for the whole run, so each distinct venue is resolved and
+        written at most once per run. Only changed address fields are written.
+        """
         Partner = self.env["res.partner"].sudo()
         pname = name or "Venue"
-        # try match by name + city if available
-        dom = [("name", "=", pname)]
-        partner = Partner.search(dom, limit=1)
+        venue_id = (venue_data or {}).get("id")
+        cache_key = venue_id or ("name", pname)
+        if venue_cache is not None and cache_key in venue_cache:
+            return venue_cache[cache_key]
+
+        partner = Partner.browse()
+        if venue_id:
+            partner = Partner.search([("ticketmaster_venue_id", "=", venue_id)], limit=1)
+        if not partner:
+            # fall back to partners created before venue ids were stored
+            dom = [("name", "=", pname)]
+            if venue_id:
+                dom.append(("ticketmaster_venue_id", "=", False))
+            partner = Partner.search(dom, limit=1)
         vals = {"name": pname, "type": "other"}
+        if venue_id:
+            vals["ticketmaster_venue_id"] = venue_id
         if venue_data:
-            # Ticketmaster venue format
+            # Ticketmaster venue format (older payloads nested these under "location")
             location = venue_data.get("location", {})
             address = venue_data.get("address", {})
+            country_code = venue_data.get("country", {}).get("countryCode") or location.get("countryCode")
+            state_code = venue_data.get("state", {}).get("stateCode") or location.get("stateCode")
             vals.update({
                 "street": address.get("line1", ""),
                 "street2": address.get("line2", ""),
-                "city": location.get("city", ""),
-                "zip": location.get("postalCode", ""),
-                "state_id": self._find_state(location.get("stateCode")),
+                "city": venue_data.get("city", {}).get("name") or location.get("city", ""),
+                "zip": venue_data.get("postalCode") or location.get("postalCode", ""),
+                "state_id": self._find_state(state_code, country_code),
             })
-            country = self._find_country(location.get("countryCode"))
+            country = self._find_country(country_code)
             if country:
                 vals["country_id"] = country
         if partner:
-            partner.write(vals)
-            return partner.id
-        return Partner.create(vals).id
+            current = partner.read(list(vals), load=False)[0]
+            changed = {field: value for field, value in vals.items() if (current[field] or False) != (value or False)}
+            if changed:
+                partner.write(changed)
+        else:
+            partner = Partner.create(vals)
+        if venue_cache is not None:
+            venue_cache[cache_key] = partner.id
+        return partner.id
 
     def _find_country(self, code):
         if not code:
             return False
-        Country = self.env["res.country"].sudo()
-        c = Country.search([("code", "=", code.upper())], limit=1)
-        return c.id or False
+        countries, _states, _states_by_code = self._ticketmaster_address_table()
+        return countries.get(code.upper(), False)
 
-    def _find_state(self, code):
+    def _find_state(self, code, country_code=None):
+        """Resolve a state within its country; without a country only an unambiguous code matches"""
         if not code:
             return False
-        State = self.env["res.country.state"].sudo()
-        s = State.search([("code", "=", code.upper())], limit=1)
-        return s.id or False
+        _countries, states, states_by_code = self._ticketmaster_address_table()
+        if country_code:
+            return states.get((country_code.upper(), code.upper()), False)
+        candidates = states_by_code.get(code.upper(), [])
+        return candidates[0] if len(candidates) == 1 else False
+
+    @api.model
+    @tools.ormcache()
+    def _ticketmaster_address_table(self):
+        """Country and state ids keyed by ISO code, loaded once per registry.
+
+        Returns ``(countries, states, states_by_code)`` where ``countries`` maps
+        a country code to its id, ``states`` maps ``(country code, state code)``
+        to a state id and ``states_by_code`` maps a bare state code to every
+        matching state id. The cache is cleared whenever countries or states
+        change (see ``ResCountry`` / ``ResCountryState``).
+        """
+        countries = {}
+        code_by_country = {}
+        for country in self.env["res.country"].sudo().with_context(active_test=False).search_read([], ["code"]):
+            if country["code"]:
+                countries[country["code"].upper()] = country["id"]
+                code_by_country[country["id"]] = country["code"].upper()
+        states = {}
+        states_by_code = {}
+        for state in self.env["res.country.state"].sudo().search_read([], ["code", "country_id"], load=False):
+            if not state["code"]:
+                continue
+            code = state["code"].upper()
+            states[(code_by_country.get(state["country_id"]), code)] = state["id"]
+            states_by_code.setdefault(code, []).append(state["id"])
+        return countries, states, states_by_code
+
+    def _select_event_image_url(self, tm_event, api_key, stats=None, quota=None):
+        """Pick the image URL for an event, sparing the images endpoint when possible.
+
+        In ``embedded`` mode (the default) the ``images`` array already present
+        in the search payload is used, and ``/events/{id}/images`` is only
+        called when it holds no usable image. ``endpoint`` mode restores the
+        old behaviour of always asking the dedicated endpoint first.
 
-    def _get_event_image_url(self, api_key, event_id):
-        """Fetch event image URL from Ticketmaster images endpoint"""
+        Raises ``QuotaExhausted`` when the endpoint is needed but the quota
+        keeps its last calls for event pages.
+        """
+        stats = stats if stats is not None else {}
+        ICP = self.env["ir.config_parameter"].sudo()
+        image_mode = ICP.get_param("ticketmaster.image_mode", "embedded")
+
+        embedded_url = self._best_image_url(tm_event.get("images", []))
+        if image_mode != "endpoint" and embedded_url:
+            stats["image_endpoint_calls_saved"] = stats.get("image_endpoint_calls_saved", 0) + 1
+            return embedded_url
+
+        image_url = self._get_event_image_url(api_key, tm_event.get("id"), stats, quota)
+        if not image_url:
+            # Nothing better anywhere: accept Ticketmaster's placeholder artwork
+            image_url = embedded_url or self._best_image_url(tm_event.get("images", []), allow_fallback=True)
+            if image_url:
+                _logger.info("Using fallback image from main event data: %s", image_url)
+        return image_url
+
+    def _best_image_url(self, images, allow_fallback=False):
+        """Return the URL of the largest image, skipping placeholders unless allowed"""
+        usable = [img for img in images or [] if img.get("url") and (allow_fallback or not img.get("fallback"))]
+        if not usable:
+            return None
+        best_image = max(usable, key=lambda x: (x.get("width") or 0) * (x.get("height") or 0))
+        return best_image.get("url")
+
+    def _get_event_image_url(self, api_key, event_id, stats=None, quota=None):
+        """Fetch event image URL from Ticketmaster images endpoint; raises ``QuotaExhausted`` when deferred"""
+        stats = stats if stats is not None else {}
         try:
             # Try both endpoints - with and without .json extension
+            api_url = self._ticketmaster_api_url()
             endpoints = [
-                f"{TICKETMASTER_API}/events/{event_id}/images",
-                f"{TICKETMASTER_API}/events/{event_id}/images.json"
+                f"{api_url}/events/{event_id}/images",
+                f"{api_url}/events/{event_id}/images.json"
             ]
             
             for url in endpoints:
                 try:
                     params = {"apikey": api_key}
-                    resp = requests.get(url, params=params, timeout=30)
-                    self._rate_limit_guard(resp)
+                    stats["image_endpoint_calls"] = stats.get("image_endpoint_calls", 0) + 1
+                    resp = self._ticketmaster_get(url, params, stats, quota, QuotaBudget.ENRICHMENT)
                     data = resp.json()
                     
                     _logger.info("Images API response for %s: %s", event_id, data)
@@ -333,54 +1095,240 @@ class NYCEventsSync(models.TransientModel):
                     # Check different possible response structures
                     images = data.get("images", []) or data.get("_embedded", {}).get("images", [])
                     
-                    if images:
-                        # Get the largest image (highest resolution)
-                        best_image = max(images, key=lambda x: x.get("width", 0) * x.get("height", 0))
-                        image_url = best_image.get("url")
+                    # Get the largest image (highest resolution)
+                    image_url = self._best_image_url(images)
+                    if image_url:
                         _logger.info("Found image for event %s: %s", event_id, image_url)
                         return image_url
                     else:
                         _logger.warning("No images found in response for event %s", event_id)
                         
+                except QuotaExhausted:
+                    # Budget is low: keep the remaining calls for event pages
+                    stats["image_endpoint_deferred"] = stats.get("image_endpoint_deferred", 0) + 1
+                    raise
                 except Exception as e:
                     _logger.warning("Failed to fetch from %s: %s", url, str(e))
                     continue
                     
+        except QuotaExhausted:
+            raise
         except Exception as e:
             _logger.warning("Failed to fetch event images for %s: %s", event_id, str(e))
         return None
 
-    def _set_event_image(self, event_record, url):
+    def _queue_event_image(self, event_record, url, stats, image_jobs=None, fingerprint=False):
+        if image_jobs is None:
+            self._download_event_images([(event_record.id, url, fingerprint)], stats)
+        else:
+            image_jobs.append((event_record.id, url, fingerprint))
+
+    def _download_event_images(self, image_jobs, stats=None):
+        """Image stage: download queued ``(event id, url, fingerprint)`` jobs
+        concurrently and write them back in batches.
+
+        Events that already hold the image from that URL are dropped before
+        any download. The source URL and a SHA-1 of the bytes are kept on the
+        event, so unchanged bytes behind a new URL skip the ``image_1920``
+        write (and the resized variants Odoo would regenerate from it).
+        The payload fingerprint is stored with the image; an event whose
+        download failed keeps none, so the next run retries it.
+        """
+        stats = stats if stats is not None else {}
+        started = time.monotonic()
+        # one recordset for every job, so the image fields are prefetched in a single query
+        events = self.env["event.event"].sudo().browse([event_id for event_id, _url, _fingerprint in image_jobs])
+        todo = []
+        for event_record, (_event_id, url, fingerprint) in zip(events, image_jobs):
+            if event_record.ticketmaster_image_url == url and event_record.ticketmaster_image_checksum:
+                stats["images_skipped"] = stats.get("images_skipped", 0) + 1
+                if fingerprint:
+                    event_record.ticketmaster_payload_hash = fingerprint
+            else:
+                todo.append((event_record, url, fingerprint))
+
+        if todo:
+            ICP = self.env["ir.config_parameter"].sudo()
+            workers = int(ICP.get_param("ticketmaster.image_workers", TM_IMAGE_WORKERS) or TM_IMAGE_WORKERS)
+            batch = []
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tm-image") as pool:
+                futures = {pool.submit(self._download_image, image_url): (event_record, image_url, fingerprint)
+                           for event_record, image_url, fingerprint in todo}
+                for future in as_completed(futures):
+                    event_record, image_url, fingerprint = futures[future]
+                    content = future.result()
+                    if content:
+                        batch.append((event_record, image_url, content, fingerprint))
+                    if len(batch) >= TM_IMAGE_WRITE_BATCH:
+                        self._store_event_images(batch, stats)
+                        batch = []
+            self._store_event_images(batch, stats)
+
+        timings = stats.setdefault("timings", {})
+        timings["images"] = timings.get("images", 0.0) + time.monotonic() - started
+
+    def _download_image(self, url):
+        """Return the image bytes behind ``url``, or None. Runs in worker threads: no ORM."""
         try:
             _logger.info("Downloading image from: %s", url)
-            r = requests.get(url, timeout=30)
-            r.raise_for_status()
+            # no retry loop: a dead image host must not hold the chunk (and its row locks) for minutes
+            r = self._ticketmaster_get(url, api_call=False, timeout=(TM_IMAGE_CONNECT_TIMEOUT, TM_IMAGE_TIMEOUT),
+                                       max_retries=TM_IMAGE_RETRIES)
             
             # Check if the response is actually an image
             content_type = r.headers.get('content-type', '').lower()
             if not content_type.startswith('image/'):
                 _logger.warning("URL does not return an image. Content-Type: %s", content_type)
-                return
+                return None
             
             # Check if the content is valid
             if len(r.content) < 100:  # Very small files are likely not valid images
                 _logger.warning("Image content too small (%d bytes), likely invalid", len(r.content))
-                return
-                
-            event_record.image_1920 = r.content
+                return None
+
             _logger.info("Successfully downloaded image (%d bytes)", len(r.content))
+            return r.content
         except Exception as e:
             _logger.warning("Failed to download event image from %s: %s", url, e)
+            return None
+
+    def _store_event_images(self, batch, stats):
+        """Write a batch of downloaded ``(event, url, content, fingerprint)`` images"""
+        for event_record, url, content, fingerprint in batch:
+            bump(stats, "image_bytes", len(content))
+            bump(stats, "bytes_downloaded", len(content))
+            checksum = hashlib.sha1(content).hexdigest()
+            vals = {"ticketmaster_image_url": url}
+            if fingerprint:
+                vals["ticketmaster_payload_hash"] = fingerprint
+            if checksum != event_record.ticketmaster_image_checksum:
+                vals.update(image_1920=base64.b64encode(content), ticketmaster_image_checksum=checksum)
+                stats["images_written"] = stats.get("images_written", 0) + 1
+            else:
+                stats["images_skipped"] = stats.get("images_skipped", 0) + 1
+            event_record.write(vals)
+        if batch:
+            self.env.flush_all()
+
+    def _log_sync_stats(self, label, stats):
+        """Log one summary line: counters first, then per-stage timings"""
+        counters = " ".join(f"{key}={value}" for key, value in sorted(stats.items())
+                            if isinstance(value, (int, float)) and not isinstance(value, bool))
+        timings = " ".join(f"{stage}={elapsed:.1f}s" for stage, elapsed in stats.get("timings", {}).items())
+        _logger.info("%s: %s timings: %s", label, counters, timings)
+
+    def _retire_stale_ticketmaster_events(self, seen_ids, window_start, window_end, engine=None):
+        """Retire Ticketmaster events of the crawled window that the feed no longer lists.
+
+        One set-based query compares the ids seen by this run with the
+        database; the stale events are then unpublished, or unpublished and
+        archived (``ticketmaster.stale_action``, default ``archive``), in one
+        bulk write. Their fingerprint is cleared so they are rewritten in
+        full if they ever reappear.
+
+        The crawl of one tier window misses events rescheduled out of it, so
+        with an ``engine`` the candidates are confirmed first by
+        ``_confirm_stale_ticketmaster_events``.
+        """
+        self.env["event.event"].flush_model(["ticketmaster_id", "date_begin", "active"])
+        self.env.cr.execute("""
+            SELECT id
+              FROM event_event
+             WHERE ticketmaster_id IS NOT NULL
+               AND active
+               AND date_begin >= %(start)s
+               AND date_begin < %(end)s
+               AND NOT (ticketmaster_id = ANY(%(seen)s))
+        """, {"start": window_start, "end": window_end, "seen": list(seen_ids)})
+        stale = self.env["event.event"].sudo().browse([row[0] for row in self.env.cr.fetchall()])
+        if stale and engine:
+            stale = self._confirm_stale_ticketmaster_events(stale, window_start, window_end, engine)
+        if not stale:
+            return 0
+        ICP = self.env["ir.config_parameter"].sudo()
+        vals = {"website_published": False, "ticketmaster_payload_hash": False}
+        if ICP.get_param("ticketmaster.stale_action", "archive") == "archive":
+            vals["active"] = False
+        stale.write(vals)
+        _logger.info("Retired %s Ticketmaster events no longer listed in the feed.", len(stale))
+        return len(stale)
+
+    def _confirm_stale_ticketmaster_events(self, events, window_start, window_end, engine):
+        """Look stale candidates up by id and return the ones to retire.
+
+        A candidate Ticketmaster still lists with a start outside the window
+        was rescheduled: it is upserted with its new dates, for its own sync
+        profile, and kept. Candidates of a profile no longer crawled are
+        retired without a lookup, as are those past the first
+        ``ticketmaster.stale_lookups`` (a mass disappearance is a feed or
+        profile change, not rescheduling). Candidates left unchecked once
+        the quota keeps its last calls for event pages, or whose lookup
+        failed, wait for the next crawl.
+        """
+        ICP = self.env["ir.config_parameter"].sudo()
+        limit = int(ICP.get_param("ticketmaster.stale_lookups", TM_STALE_LOOKUPS) or 0)
+        retire = events.browse()
+        rescheduled = {}  # profile id -> payloads
+        for index, event in enumerate(events):
+            profile = event.ticketmaster_profile_id
+            if index >= limit or (profile and profile.id not in engine.profiles):
+                retire |= event
+                continue
+            try:
+                payload = self._lookup_ticketmaster_event(engine.api_key, event.ticketmaster_id, engine.stats,
+                                                          engine.quota)
+            except QuotaExhausted:
+                break
+            except Exception as e:
+                _logger.warning("Could not confirm stale Ticketmaster event %s: %s", event.ticketmaster_id, e)
+                continue
+            begin = payload and self._parse_ticketmaster_date(payload.get("dates", {}).get("start", {}).get("dateTime"))
+            if not begin or window_start <= begin < window_end:
+                retire |= event  # gone, date to be announced, or out of the searches of the crawl
+            else:
+                rescheduled.setdefault(profile.id, []).append(payload)
+
+        if rescheduled:
+            _logger.info("%s stale Ticketmaster events were rescheduled out of the window; updating them.",
+                         sum(len(payloads) for payloads in rescheduled.values()))
+            image_jobs = []
+            for profile_id, payloads in rescheduled.items():
+                counts = self._upsert_ticketmaster_events(payloads, engine, image_jobs, engine.profiles.get(profile_id))
+                for key, value in counts.items():
+                    engine.counts[key] = engine.counts.get(key, 0) + value
+            if engine.images:
+                self._download_event_images(image_jobs, engine.stats)
+        return retire
+
+    def _lookup_ticketmaster_event(self, api_key, tm_id, stats=None, quota=None):
+        """Fetch one event by id; None when Ticketmaster no longer lists it.
+
+        Spends an enrichment call of ``quota``, so it raises ``QuotaExhausted``
+        once only the calls kept for event pages are left.
+        """
+        url = f"{self._ticketmaster_api_url()}/events/{tm_id}.json"
+        try:
+            return self._ticketmaster_get(url, {"apikey": api_key}, stats, quota, QuotaBudget.ENRICHMENT).json()
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
+
+    def _unpublish_non_ticketmaster_websites(self, profiles, default_website_id):
+        """Unpublish non-Ticketmaster events on every website the sync profiles publish to"""
+        websites = {profile.website_id.id or default_website_id for profile in profiles}
+        if not websites or not all(websites):
+            websites = {default_website_id}  # some events go to every website
+        for website_id in websites:
+            self._unpublish_non_ticketmaster_events(website_id)
 
     def _unpublish_non_ticketmaster_events(self, website_id):
         """Ensure only API-synced events show on website."""
         dom = [("website_published", "=", True), ("ticketmaster_id", "=", False)]
         if website_id:
             dom.append(("website_id", "=", website_id))
-        events = self.env["event.event"].sudo().search(dom, limit=1000)
+        events = self.env["event.event"].sudo().search(dom)
         # Avoid deactivating (keep them in backend), just unpublish
         if events:
             events.write({"website_published": False})
             _logger.info("Unpublished %s non-Ticketmaster events from website.", len(events))
-
-
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models
+from odoo.exceptions import ValidationError
+
+
+class NYCEventsSyncProfile(models.Model):
+    """One market crawled by the sync: where to look, what to keep and which website shows it.
+
+    Every active profile is crawled by each run, concurrently and under the
+    shared Ticketmaster rate limit. An event listed by several profiles is
+    imported once, for the first profile in sequence order.
+    """
+    _name = "nyc.events.sync.profile"
+    _description = "NYC Events Sync Profile"
+    _order = "sequence, id"
+
+    name = fields.Char(required=True)
+    active = fields.Boolean(default=True)
+    sequence = fields.Integer(default=10, help="Events listed by several profiles go to the first one")
+
+    # Where: any combination the Discovery API accepts
+    city = fields.Char()
+    state_code = fields.Char(help="State code, e.g. NY")
+    country_code = fields.Char(default="US", help="ISO country code, e.g. US")
+    dma_id = fields.Char(string="DMA ID", help="Ticketmaster Designated Market Area id, e.g. 345 for New York")
+    geo_point = fields.Char(string="Geo Point", help="Geohash of the search centre, e.g. dr5regw for Manhattan")
+    radius = fields.Integer(help="Search radius around the geo point")
+    unit = fields.Selection([("miles", "Miles"), ("km", "Kilometers")], default="miles")
+
+    # What
+    segment_ids = fields.Char(string="Segment IDs",
+                              help="Comma-separated Ticketmaster segment ids, e.g. KZFzniwnSyZfZ7v7nJ for Music")
+    classification_names = fields.Char(help="Comma-separated classification names (segment, genre or type), "
+                                            "e.g. Music,Sports")
+
+    # Where to
+    website_id = fields.Many2one("website", string="Website",
+                                 help="Website of the imported events; the Ticketmaster default website when empty")
+    event_count = fields.Integer(compute="_compute_event_count")
+
+    @api.constrains("city", "dma_id", "geo_point")
+    def _check_location(self):
+        for profile in self:
+            if not (profile.city or profile.dma_id or profile.geo_point):
+                raise ValidationError(f"Sync profile {profile.name} needs a city, a DMA ID or a geo point.")
+
+    def _compute_event_count(self):
+        counts = dict(self.env["event.event"].sudo().with_context(active_test=False)._read_group(
+            [("ticketmaster_profile_id", "in", self.ids)], ["ticketmaster_profile_id"], ["__count"]))
+        for profile in self:
+            profile.event_count = counts.get(profile, 0)
+
+    def _ticketmaster_query(self):
+        """Discovery API search parameters selecting the events of this profile"""
+        self.ensure_one()
+
+        def csv(value):
+            return ",".join(part.strip() for part in value.split(",") if part.strip())
+
+        query = {}
+        if self.city:
+            query["city"] = self.city
+        if self.state_code:
+            query["stateCode"] = self.state_code
+        if self.country_code:
+            query["countryCode"] = self.country_code
+        if self.dma_id:
+            query["dmaId"] = self.dma_id
+        if self.geo_point:
+            query["geoPoint"] = self.geo_point
+            if self.radius:
+                query.update(radius=self.radius, unit=self.unit or "miles")
+        if self.segment_ids:
+            query["segmentId"] = csv(self.segment_ids)
+        if self.classification_names:
+            query["classificationName"] = csv(self.classification_names)
+        return query
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models
+
+
+class NYCEventsSyncQuota(models.Model):
+    """Ticketmaster calls made per UTC day, shared by every sync run."""
+    _name = "nyc.events.sync.quota"
+    _description = "NYC Events Sync Daily API Quota"
+    _order = "day desc"
+    _rec_name = "day"
+
+    day = fields.Date(required=True, index=True)
+    calls = fields.Integer(help="Ticketmaster API calls made (or claimed by a running sync) on this day (UTC)")
+
+    _sql_constraints = [
+        ("day_uniq", "unique(day)", "There is already a quota counter for this day."),
+    ]
+
+    @api.model
+    def _calls_today(self, day):
+        quota = self.sudo().search([("day", "=", day)], limit=1)
+        return quota.calls
+
+    @api.model
+    def _claimer(self, day, limit):
+        """Return ``claim(calls, floor)`` moving calls of ``day`` in and out of the counter.
+
+        ``claim`` counts up to ``calls`` more calls without going past
+        ``limit - floor`` and returns ``(calls granted, calls counted for the
+        day)``; a negative ``calls`` hands unspent calls back. Each claim is
+        one atomic ``UPDATE`` in its own short READ COMMITTED transaction on
+        a new cursor, so it is safe in worker threads, it never conflicts
+        with the long sync transaction, and every process (parallel shard
+        workers included) draws from the same counter.
+        """
+        registry, uid = self.env.registry, self.env.uid
+
+        def claim(calls, floor=0):
+            with registry.cursor() as cr:
+                cr.execute("SET TRANSACTION ISOLATION LEVEL READ COMMITTED")
+                cr.execute("""
+                    INSERT INTO nyc_events_sync_quota (day, calls, create_uid, create_date, write_uid, write_date)
+                    VALUES (%(day)s, 0, %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC')
+                    ON CONFLICT (day) DO NOTHING
+                """, {"day": day, "uid": uid})
+                # a whole block when it fits, else one call at a time up to the ceiling
+                for size in dict.fromkeys((calls, 1) if calls > 0 else (calls,)):
+                    cr.execute("""
+                        UPDATE nyc_events_sync_quota
+                           SET calls = GREATEST(calls + %(size)s, 0),
+                               write_date = now() at time zone 'UTC'
+                         WHERE day = %(day)s
+                           AND (%(size)s <= 0 OR calls + %(size)s <= %(ceiling)s)
+                     RETURNING calls
+                    """, {"day": day, "size": size, "ceiling": limit - floor})
+                    row = cr.fetchone()
+                    if row:
+                        return size, row[0]
+                cr.execute("SELECT calls FROM nyc_events_sync_quota WHERE day = %s", [day])
+                return 0, cr.fetchone()[0]
+
+        return claim
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models
+
+# stats key -> run field, for the plain counters collected during a sync
+RUN_COUNTERS = {
+    "api_calls": "api_calls",
+    "retries": "retry_count",
+    "pages": "pages",
+    "windows": "windows",
+    "split_windows": "split_windows",
+    "events": "events_fetched",
+    "created": "created_count",
+    "updated": "updated_count",
+    "unchanged": "unchanged_count",
+    "skipped": "skipped_count",
+    "failed": "failed_count",
+    "stale": "stale_count",
+    "duplicates": "duplicate_count",
+    "bytes_downloaded": "bytes_downloaded",
+    "image_bytes": "image_bytes",
+    "images_written": "images_written",
+    "images_skipped": "images_skipped",
+    "image_endpoint_calls": "image_endpoint_calls",
+    "image_endpoint_calls_saved": "image_endpoint_calls_saved",
+    "http_requests": "http_requests",
+    "http_reused": "http_reused",
+    "quota_used": "quota_used",
+    "quota_remaining": "quota_remaining",
+}
+
+# stats["timings"] key -> run field
+RUN_TIMINGS = {
+    "fetch": "fetch_time",
+    "venue": "venue_time",
+    "upsert": "upsert_time",
+    "images": "image_time",
+    "unpublish": "unpublish_time",
+}
+
+
+class NYCEventsSyncRun(models.Model):
+    """One row per sync run, so sync performance can be followed over time."""
+    _name = "nyc.events.sync.run"
+    _description = "NYC Events Sync Run"
+    _order = "started_at desc, id desc"
+    _rec_name = "started_at"
+
+    trigger = fields.Selection([("manual", "Manual"), ("cron", "Scheduled"), ("shard", "Shard")],
+                               required=True, default="cron")
+    parent_id = fields.Many2one("nyc.events.sync.run", string="Sharded Run", index=True, ondelete="cascade",
+                                help="Sharded crawl this shard run belongs to")
+    child_ids = fields.One2many("nyc.events.sync.run", "parent_id", string="Shard Runs")
+    shard_ids = fields.One2many("nyc.events.sync.shard", "run_id", string="Shards")
+    state = fields.Selection(
+        [("queued", "Queued"), ("running", "Running"), ("done", "Done"), ("failed", "Failed"),
+         ("skipped", "Skipped")],
+        default="running", required=True,
+    )
+    user_id = fields.Many2one("res.users", string="Requested By", help="User who queued the run from the Settings")
+    started_at = fields.Datetime(required=True, default=fields.Datetime.now)
+    ended_at = fields.Datetime()
+    duration = fields.Float(string="Duration (s)", compute="_compute_duration", store=True, aggregator="avg")
+    resumed = fields.Boolean(help="The run continued an interrupted crawl from its checkpoint")
+    crawl_complete = fields.Boolean(help="Every page of the crawl window was fetched")
+    tiers = fields.Char(string="Refresh Tiers", help="Refresh tiers crawled by this run")
+    progress = fields.Float(help="Share of the crawl window committed so far, in percent")
+    quota_exhausted = fields.Boolean(help="The run stopped early because the daily API quota ran out")
+    error_message = fields.Text()
+
+    # Volume
+    api_calls = fields.Integer(string="API Calls")
+    retry_count = fields.Integer(string="Retries", help="Requests retried after a 429, server error or connection failure")
+    pages = fields.Integer()
+    windows = fields.Integer(string="Date Windows")
+    split_windows = fields.Integer(string="Split Windows")
+    events_fetched = fields.Integer()
+    # bytes can exceed a 32-bit integer on a full crawl
+    bytes_downloaded = fields.Float(string="Bytes Downloaded", digits=(16, 0))
+    image_bytes = fields.Float(digits=(16, 0))
+    http_requests = fields.Integer(string="HTTP Requests")
+    http_reused = fields.Integer(string="Reused Connections")
+    image_endpoint_calls = fields.Integer()
+    image_endpoint_calls_saved = fields.Integer()
+    quota_used = fields.Integer(string="Quota Used Today", help="Ticketmaster calls made today, all runs included")
+    quota_remaining = fields.Integer(string="Quota Remaining", help="Ticketmaster calls left today after this run")
+
+    # Outcome
+    created_count = fields.Integer(string="Created")
+    updated_count = fields.Integer(string="Updated")
+    unchanged_count = fields.Integer(string="Unchanged")
+    skipped_count = fields.Integer(string="Skipped")
+    failed_count = fields.Integer(string="Failed")
+    duplicate_count = fields.Integer(string="Duplicates", help="Events listed by more than one sync profile, imported once")
+    stale_count = fields.Integer(string="Retired", help="Events no longer listed by Ticketmaster, unpublished or archived")
+    images_written = fields.Integer()
+    images_skipped = fields.Integer()
+    error_count = fields.Integer(string="Errors")
+
+    # Time per phase, in seconds
+    fetch_time = fields.Float(string="Fetch (s)", help="Time spent waiting for Ticketmaster pages", aggregator="avg")
+    venue_time = fields.Float(string="Venue Resolution (s)", aggregator="avg")
+    upsert_time = fields.Float(string="Upsert (s)", help="Event writes, venue resolution excluded", aggregator="avg")
+    image_time = fields.Float(string="Images (s)", aggregator="avg")
+    unpublish_time = fields.Float(string="Unpublish (s)", help="Reconciliation: stale and non-Ticketmaster events",
+                                  aggregator="avg")
+
+    @api.depends("started_at", "ended_at")
+    def _compute_duration(self):
+        for run in self:
+            if run.started_at and run.ended_at:
+                run.duration = (run.ended_at - run.started_at).total_seconds()
+            else:
+                run.duration = 0.0
+
+    @api.model
+    def _next_queued(self):
+        """Oldest run queued from the Settings and not started yet (never the run of a shard)"""
+        return self.sudo().search([("state", "=", "queued"), ("parent_id", "=", False)], order="id", limit=1)
+
+    def _notify_requester(self, message, level="info"):
+        """Push a notification about the run to the user who queued it"""
+        for run in self.filtered("user_id"):
+            run.user_id._bus_send("simple_notification", {
+                "type": level,
+                "title": "Ticketmaster Sync",
+                "message": message,
+                "sticky": level == "danger",
+            })
+
+    def _sum_shard_runs(self):
+        """Counters and phase timings of the shard runs added up, as a sync ``stats`` dict"""
+        self.ensure_one()
+        children = self.child_ids
+        stats = {key: sum(children.mapped(field)) for key, field in RUN_COUNTERS.items()}
+        stats["timings"] = {key: sum(children.mapped(field)) for key, field in RUN_TIMINGS.items()}
+        latest = children[:1]  # quota figures are daily totals: the latest shard run has them
+        stats.update(quota_used=latest.quota_used, quota_remaining=latest.quota_remaining)
+        stats["errors"] = sum(children.mapped("error_count")) - stats["failed"]
+        stats["quota_exhausted"] = any(children.mapped("quota_exhausted"))
+        return stats
+
+    def _update_from_stats(self, stats, **extra):
+        """Copy the counters and phase timings of a sync ``stats`` dict onto the run"""
+        self.ensure_one()
+        vals = {field: stats[key] for key, field in RUN_COUNTERS.items() if key in stats}
+        vals.update({field: stats["timings"][key] for key, field in RUN_TIMINGS.items()
+                     if key in stats.get("timings", {})})
+        vals["resumed"] = bool(stats.get("resumed"))
+        vals["crawl_complete"] = bool(stats.get("crawl_complete"))
+        vals["quota_exhausted"] = bool(stats.get("quota_exhausted"))
+        vals["error_count"] = stats.get("failed", 0) + stats.get("errors", 0)
+        vals.update(extra)
+        self.write(vals)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models
+
+
+class NYCEventsSyncShard(models.Model):
+    """One slice (date window or segment) of a sharded crawl, run as its own job.
+
+    Shard worker crons claim shards with ``FOR UPDATE SKIP LOCKED``, so any
+    number of them can work through one crawl in parallel. Each shard has
+    its own checkpoint and keeps the Ticketmaster ids it saw, which the
+    final merge step needs to reconcile stale events.
+    """
+    _name = "nyc.events.sync.shard"
+    _description = "NYC Events Sync Shard"
+    _order = "sequence, id"
+
+    run_id = fields.Many2one("nyc.events.sync.run", required=True, index=True, ondelete="cascade")
+    sequence = fields.Integer()
+    tier = fields.Char(required=True, help="Refresh tier the shard belongs to")
+    segment_id = fields.Char(string="Segment ID", help="Ticketmaster segment crawled by a segment shard")
+    window_start = fields.Datetime()
+    window_end = fields.Datetime()
+    state = fields.Selection(
+        [("pending", "Pending"), ("running", "Running"), ("done", "Done"), ("failed", "Failed")],
+        default="pending", required=True, index=True,
+    )
+    state_id = fields.Many2one("nyc.events.sync.state", string="Checkpoint", ondelete="set null")
+    attempts = fields.Integer()
+    truncated = fields.Boolean(help="Some date windows held more events than the API pages through, so the shard "
+                                    "did not see every event and its tier is not reconciled")
+    seen_ids = fields.Text(help="Ticketmaster ids listed in the shard, one per line")
+    error_message = fields.Text()
+
+    @api.model
+    def _claim(self, lease):
+        """Lock and return the next shard to run, or an empty recordset.
+
+        Pending shards come first in sequence order; a running shard whose
+        checkpoint has not moved for ``lease`` belonged to a worker that
+        died and is taken over. Rows locked by other workers are skipped.
+        """
+        self.env.flush_all()
+        self.env.cr.execute("""
+            SELECT shard.id
+              FROM nyc_events_sync_shard shard
+              LEFT JOIN nyc_events_sync_state checkpoint ON checkpoint.id = shard.state_id
+             WHERE shard.state = 'pending'
+                OR (shard.state = 'running' AND checkpoint.checkpoint_at < %s)
+             ORDER BY shard.sequence, shard.id
+             LIMIT 1
+               FOR UPDATE OF shard SKIP LOCKED
+        """, [fields.Datetime.now() - lease])
+        row = self.env.cr.fetchone()
+        return self.sudo().browse(row[0] if row else [])
+
+    def _seen_id_set(self):
+        return {tm_id for shard in self for tm_id in (shard.seen_ids or "").split()}
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models
+
+
+class NYCEventsSyncState(models.Model):
+    """Checkpoint of a Ticketmaster crawl, committed after every chunk.
+
+    There is one checkpoint per refresh tier, named after it. A run that
+    stops before reaching ``done`` leaves its checkpoint behind; the next
+    run resumes the crawl from ``resume_from`` instead of starting over
+    from the beginning of the window.
+    """
+    _name = "nyc.events.sync.state"
+    _description = "NYC Events Sync Checkpoint"
+
+    name = fields.Char(required=True, index=True, default="default")
+    state = fields.Selection(
+        [("done", "Done"), ("running", "Running")],
+        default="done", required=True,
+    )
+    window_start = fields.Datetime(help="Start of the crawl window of the current run")
+    window_end = fields.Datetime(help="End of the crawl window of the current run")
+    resume_from = fields.Datetime(help="Every event starting before this moment has been committed")
+    page = fields.Integer(help="Pages fetched by the current run when the checkpoint was saved")
+    last_ticketmaster_id = fields.Char(help="Last Ticketmaster event committed")
+    events_done = fields.Integer(help="Events committed by the current run")
+    started_at = fields.Datetime()
+    checkpoint_at = fields.Datetime()
+    last_crawled = fields.Datetime(help="Start of the last complete crawl of this window")
+
+    _sql_constraints = [
+        ("name_uniq", "unique(name)", "There is already a sync checkpoint with this name."),
+    ]
+
+    @api.model
+    def _get_state(self, name="default"):
+        state = self.sudo().search([("name", "=", name)], limit=1)
+        return state or self.sudo().create({"name": name})
+
+    def _is_due(self, interval, now):
+        self.ensure_one()
+        return not self.last_crawled or self.last_crawled + interval <= now
+
+    def _can_resume(self):
+        self.ensure_one()
+        return self.state == "running" and bool(self.resume_from and self.window_end)
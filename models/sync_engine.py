@@ -0,0 +1,378 @@
+# -*- coding: utf-8 -*-
+"""Batch sync engine shared by the cron and the manual fetch.
+
+``SyncEngine`` drives one Ticketmaster sync run through its stages: the
+crawl streams pages, each chunk of pages is upserted, its images are
+downloaded and a checkpoint is committed, and once the crawl is over the
+database is reconciled with the feed. The ORM work itself stays on the
+``nyc.events.sync`` model so it can be extended the usual Odoo way; the
+engine only carries the run context (settings, quota, caches, run log
+record, checkpoint) that those methods used to find in the ``stats`` dict.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta, timezone
+
+from odoo import fields
+
+_logger = logging.getLogger(__name__)
+
+# Stages that can be switched off; fetching and upserting always run
+OPTIONAL_STAGES = ("images", "reconcile")
+# A tier is due this long before its interval is over, so an hourly cron keeps an hourly tier hourly
+TIER_SLACK = timedelta(minutes=10)
+
+# Slice of the crawl horizon, ``start``/``end`` as offsets from now, refreshed every ``interval``
+RefreshTier = namedtuple("RefreshTier", "name start end interval")
+
+
+class SyncEngine:
+    """One sync run. Build it with ``nyc.events.sync._sync_engine()`` and call ``run()``.
+
+    The horizon is crawled per ``RefreshTier``, each with its own checkpoint
+    (a ``nyc.events.sync.state`` named after the tier). A tier is crawled
+    when its interval has elapsed since its last complete crawl, when its
+    crawl was interrupted, or always with ``force_all``. Within a tier the
+    sync ``profiles`` are crawled together by one ``WindowCrawler``; an
+    event listed by several profiles is upserted once, for the first
+    profile in sequence order.
+
+    A shard of a sharded crawl runs the same engine over one slice: its
+    checkpoint comes in through ``states``, ``segment_id`` narrows every
+    profile's search, and ``use_lock`` is off since the shards of one crawl
+    run side by side.
+
+    ``stats`` only holds plain counters, flags and ``timings``; it is what
+    ends up on the run log record and in the summary log line.
+    """
+
+    def __init__(self, sync, trigger, api_key, auto_publish=True, website_id=False, restrict_only_api=True,
+                 stages=OPTIONAL_STAGES, chunk_size=500, label="NYC Events Sync", run_log=None, tiers=(),
+                 force_all=False, profiles=None, states=None, segment_id=False, use_lock=True):
+        unknown = set(stages) - set(OPTIONAL_STAGES)
+        if unknown:
+            raise ValueError(f"Unknown sync stages: {', '.join(sorted(unknown))}")
+        self.sync = sync
+        self.env = sync.env
+        self.trigger = trigger
+        self.label = label
+        self.api_key = api_key
+        self.auto_publish = auto_publish
+        self.website_id = website_id
+        self.restrict_only_api = restrict_only_api
+        self.stages = frozenset(stages)
+        self.chunk_size = max(1, chunk_size)
+        self.tiers = tiers
+        self.force_all = force_all
+        # crawler scopes are profile ids; no profile at all means the default NYC query
+        self.profiles = {profile.id: profile for profile in profiles or ()}
+        self.ranks = {profile_id: rank for rank, profile_id in enumerate(self.profiles)}
+        self.states = states or {}  # tier name -> checkpoint, when not the tier's own
+        self.segment_id = segment_id
+        self.use_lock = use_lock
+
+        self.stats = {"timings": {}}
+        self.counts = {}
+        self.run_log = run_log or None  # a queued run record to carry out, if any
+        self.sync_state = None  # checkpoint of the tier being crawled
+        self.crawled_tiers = []
+        self.quota = None
+        self.quota_day = None
+        self.venue_cache = {}
+        self.seen_ids = {}  # Ticketmaster id -> rank of the profile it was upserted for, in the current tier
+        self.failed_ids = []
+        self.skipped = False
+        self.error = None
+
+    @property
+    def images(self):
+        return "images" in self.stages
+
+    # -------------- Run --------------
+    def run(self):
+        """Run every stage under the sync lock; returns the engine for its outcome"""
+        if self.use_lock and not self.sync._acquire_sync_lock():
+            self.skipped = True
+            if self.run_log:
+                _logger.info("Another Ticketmaster sync is running; queued run %s stays queued.", self.run_log.id)
+            else:
+                _logger.info("Another Ticketmaster sync is running; skipping this run.")
+                self._skip_run()
+            return self
+        try:
+            self._start_run()
+            try:
+                self._run_stages()
+                self._finish_run()
+                self.sync._log_sync_stats(self.label, self.stats)
+                self.run_log._notify_requester(self.summary(), "success")
+            except Exception as e:
+                _logger.exception("Error in %s", self.label)
+                self.error = e
+                self._fail_run(e)
+                self.run_log._notify_requester(self.summary(), "danger")
+        finally:
+            if self.use_lock:
+                self.sync._release_sync_lock()
+        return self
+
+    def _run_stages(self):
+        http_snapshot = self.sync._http_configure().snapshot()
+        self._start_quota()
+        now = fields.Datetime.now()
+        complete = True
+        for tier in self.tiers:
+            if self.stats.get("quota_exhausted"):
+                complete = False
+                break
+            sync_state = self.states.get(tier.name) or self.env["nyc.events.sync.state"]._get_state(tier.name)
+            if self.force_all or sync_state._can_resume() or sync_state._is_due(tier.interval - TIER_SLACK, now):
+                complete = self._crawl_tier(tier, sync_state, now) and complete
+        self.stats["crawl_complete"] = complete
+
+        if "reconcile" in self.stages and self.restrict_only_api:
+            started = time.monotonic()
+            self.sync._unpublish_non_ticketmaster_websites(self.profiles.values(), self.website_id)
+            timings = self.stats["timings"]
+            timings["unpublish"] = timings.get("unpublish", 0.0) + time.monotonic() - started
+        self.sync._http_report(http_snapshot, self.stats)
+        self.stats.update(self.counts)
+
+    def _crawl_tier(self, tier, sync_state, now):
+        """Crawl one tier window chunk by chunk; returns whether the crawl completed"""
+        self.sync_state = sync_state
+        self.seen_ids = {}
+        self.crawled_tiers.append(tier.name)
+        resumed = self._begin_state(tier, now)
+        queries = self._queries()
+        if not queries:
+            # segment shard that no profile searches: nothing to crawl
+            self._finish_state(True)
+            return True
+        crawler = self.sync._ticketmaster_crawler(self.api_key, self.stats, *self._checkpoint_window(),
+                                                  quota=self.quota, queries=queries)
+        chunk, page_keys = [], []
+        for page_key, page_events in crawler.pages():
+            chunk.extend((page_key[0], event) for event in page_events)
+            page_keys.append(page_key)
+            if len(chunk) >= self.chunk_size:
+                self._process_chunk(chunk, page_keys, crawler)
+                chunk, page_keys = [], []
+        if page_keys:
+            self._process_chunk(chunk, page_keys, crawler)
+
+        if "reconcile" in self.stages:
+            self._retire_stale(crawler.complete, resumed, crawler.truncated)
+        self._finish_state(crawler.complete)
+        return crawler.complete
+
+    def _queries(self):
+        """Search parameters per crawler scope (profile id), narrowed to ``segment_id`` for a segment shard"""
+        if not self.profiles:
+            queries = {None: self.sync._ticketmaster_default_query()}
+        else:
+            queries = {profile_id: profile._ticketmaster_query() for profile_id, profile in self.profiles.items()}
+        if self.segment_id:
+            for scope, query in list(queries.items()):
+                allowed = query.get("segmentId")
+                if allowed and self.segment_id not in allowed.split(","):
+                    del queries[scope]  # the profile never lists this segment
+                else:
+                    query["segmentId"] = self.segment_id
+        return queries
+
+    def summary(self):
+        """One line for the user describing how the run went"""
+        if self.skipped:
+            return "A Ticketmaster sync is already running. This run was skipped; try again once it has finished."
+        if self.error:
+            return f"Error: {self.error}"
+        counts = self.counts
+        message = (f"Success! Found {self.stats.get('events', 0)} NYC events from Ticketmaster. "
+                   f"Created: {counts.get('created', 0)}, Updated: {counts.get('updated', 0)}, "
+                   f"Unchanged: {counts.get('unchanged', 0)}, Skipped: {counts.get('skipped', 0)}")
+        if self.stats.get("quota_exhausted"):
+            message += ". Daily API quota reached: the crawl resumes on the next run"
+        return message
+
+    # -------------- Chunk stages --------------
+    def _process_chunk(self, chunk, page_keys, crawler):
+        """Upsert and image stages for one chunk of ``(profile id, event)``, then commit it with a checkpoint"""
+        timings = self.stats["timings"]
+        image_jobs = []
+        upsert_started = time.monotonic()
+        venue_before = timings.get("venue", 0.0)
+        for profile_id, events in self._dedupe(chunk).items():
+            for key, value in self.sync._upsert_ticketmaster_events(events, self, image_jobs,
+                                                                    self.profiles.get(profile_id)).items():
+                self.counts[key] = self.counts.get(key, 0) + value
+        # venue resolution is timed on its own, keep it out of the upsert phase
+        venue_elapsed = timings.get("venue", 0.0) - venue_before
+        timings["upsert"] = timings.get("upsert", 0.0) + time.monotonic() - upsert_started - venue_elapsed
+
+        if self.images:
+            self.sync._download_event_images(image_jobs, self.stats)
+        crawler.mark_done(page_keys)
+        self._save_checkpoint(crawler, chunk)
+
+    def _dedupe(self, chunk):
+        """Group the chunk by profile, keeping each event only for its first profile in sequence order.
+
+        Events already upserted in this tier for the same or a better
+        ranked profile are dropped and counted as duplicates.
+        """
+        best = {}
+        for profile_id, event in chunk:
+            rank = self.ranks.get(profile_id, 0)
+            if event.get("id") and rank < best.get(event["id"], rank + 1):
+                best[event["id"]] = rank
+        groups = {}
+        for profile_id, event in chunk:
+            tm_id = event.get("id")
+            rank = self.ranks.get(profile_id, 0)
+            if tm_id:
+                previous = self.seen_ids.get(tm_id)
+                if rank > best[tm_id] or (previous is not None and previous <= rank):
+                    self.counts["duplicates"] = self.counts.get("duplicates", 0) + 1
+                    continue
+                self.seen_ids[tm_id] = rank
+            groups.setdefault(profile_id, []).append(event)
+        return groups
+
+    def _retire_stale(self, complete, resumed, truncated=()):
+        """Retire the Ticketmaster events of the tier window that the crawl did not see.
+
+        Only a crawl that saw every event of the window can tell which are
+        gone: a crawl cut short, resumed, or with truncated windows (too
+        deep to page through) is not reconciled.
+        """
+        if not complete or resumed or truncated:
+            _logger.info("Skipping stale event reconciliation of %s: the crawl was %s",
+                         self.sync_state.name, "resumed" if resumed else "not completed" if not complete
+                         else f"truncated in {len(truncated)} windows")
+            return
+        started = time.monotonic()
+        self.stats["stale"] = self.stats.get("stale", 0) + self.sync._retire_stale_ticketmaster_events(
+            self.seen_ids, self.sync_state.window_start, self.sync_state.window_end, self)
+        timings = self.stats["timings"]
+        timings["unpublish"] = timings.get("unpublish", 0.0) + time.monotonic() - started
+
+    # -------------- Daily API quota --------------
+    def _start_quota(self):
+        self.quota, self.quota_day = self.sync._ticketmaster_quota()
+        self.stats["quota_remaining"] = self.quota.remaining
+
+    def flush_quota(self):
+        """Hand the claimed calls not spent yet back to the daily counter (they are counted as they are claimed)"""
+        if not self.quota:
+            return
+        self.quota.release()
+        self.stats["quota_used"] = self.quota.used
+        self.stats["quota_remaining"] = self.quota.remaining
+
+    # -------------- Checkpoint --------------
+    def _begin_state(self, tier, now):
+        """Resume the interrupted crawl of the tier, or start its window anew; returns whether it resumed"""
+        sync_state = self.sync_state
+        if sync_state._can_resume():
+            # a checkpoint still at the start of its window (e.g. a planned shard) is crawled in full
+            if sync_state.resume_from <= sync_state.window_start:
+                return False
+            self.stats["resumed"] = True
+            _logger.info("Resuming interrupted Ticketmaster crawl of %s from %s (last event %s, %s events done)",
+                         tier.name, sync_state.resume_from, sync_state.last_ticketmaster_id, sync_state.events_done)
+            return True
+        sync_state.write({
+            "state": "running",
+            "window_start": now + tier.start,
+            "window_end": now + tier.end,
+            "resume_from": now + tier.start,
+            "page": 0,
+            "last_ticketmaster_id": False,
+            "events_done": 0,
+            "started_at": fields.Datetime.now(),
+            "checkpoint_at": fields.Datetime.now(),
+        })
+        self.sync._commit_progress()
+        return False
+
+    def _checkpoint_window(self):
+        """Crawl window still to do, as aware UTC datetimes"""
+        return (self.sync_state.resume_from.replace(tzinfo=timezone.utc),
+                self.sync_state.window_end.replace(tzinfo=timezone.utc))
+
+    def _save_checkpoint(self, crawler, chunk):
+        vals = {
+            "page": self.stats.get("pages", 0),
+            "events_done": self.sync_state.events_done + len(chunk),
+            "resume_from": crawler.frontier().replace(tzinfo=None),
+            "checkpoint_at": fields.Datetime.now(),
+        }
+        if chunk:
+            vals["last_ticketmaster_id"] = chunk[-1][1].get("id")
+        self.sync_state.write(vals)
+        self.flush_quota()
+        progress = self._progress(vals["resume_from"])
+        self.run_log._update_from_stats(dict(self.stats, **self.counts), progress=progress)
+        self.run_log._notify_requester(
+            f"{self.sync_state.name}: {progress:.0f}% crawled, {self.stats.get('events', 0)} events, "
+            f"{self.counts.get('created', 0)} created, {self.counts.get('updated', 0)} updated")
+        self.sync._commit_progress()
+
+    def _progress(self, frontier):
+        """Share of the crawl window (in time) committed up to ``frontier``, in percent"""
+        window_start, window_end = self.sync_state.window_start, self.sync_state.window_end
+        span = (window_end - window_start).total_seconds()
+        if span <= 0:
+            return 100.0
+        return min(max((frontier - window_start).total_seconds() / span * 100.0, 0.0), 100.0)
+
+    def _finish_state(self, complete):
+        """Close the checkpoint; a crawl cut short (e.g. by the quota) stays resumable"""
+        vals = {"checkpoint_at": fields.Datetime.now()}
+        if complete:
+            # due times count from the start of the crawl, not from when it ended
+            vals.update(state="done", last_crawled=self.sync_state.started_at)
+        self.sync_state.write(vals)
+        self.sync._commit_progress()
+
+    # -------------- Run log --------------
+    def _start_run(self):
+        """Create (or take over the queued) run log record and commit it so the run is visible while it works"""
+        if self.run_log:
+            self.run_log.write({"state": "running", "started_at": fields.Datetime.now()})
+        else:
+            self.run_log = self.env["nyc.events.sync.run"].sudo().create({"trigger": self.trigger})
+        self.sync._commit_progress()
+
+    def _skip_run(self):
+        """Record a run that did not start because another one holds the sync lock"""
+        now = fields.Datetime.now()
+        self.run_log = self.env["nyc.events.sync.run"].sudo().create({
+            "trigger": self.trigger,
+            "state": "skipped",
+            "started_at": now,
+            "ended_at": now,
+            "error_message": "Another Ticketmaster sync was already running.",
+        })
+        self.sync._commit_progress()
+
+    def _finish_run(self):
+        self.flush_quota()
+        vals = {"progress": 100.0} if self.stats.get("crawl_complete") else {}
+        self.run_log._update_from_stats(self.stats, state="done", ended_at=fields.Datetime.now(),
+                                        tiers=", ".join(self.crawled_tiers), **vals)
+        self.sync._commit_progress()
+
+    def _fail_run(self, error):
+        """Mark the run failed; the uncommitted chunk is rolled back, committed chunks are kept"""
+        if not getattr(threading.current_thread(), "testing", False):
+            self.env.cr.rollback()
+        self.stats["errors"] = self.stats.get("errors", 0) + 1
+        self.stats.update(self.counts)
+        self.flush_quota()
+        self.run_log._update_from_stats(self.stats, state="failed", ended_at=fields.Datetime.now(),
+                                        tiers=", ".join(self.crawled_tiers), error_message=str(error))
+        self.sync._commit_progress()
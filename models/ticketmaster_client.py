@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""Plain-Python helpers shared by the Ticketmaster sync (no ORM access here,
+so everything in this module is safe to call from worker threads)."""
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+_logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket enforcing a requests-per-second ceiling.
+
+    Every caller draws one token per request; tokens refill continuously at
+    ``rate`` per second up to ``capacity``. ``pause`` empties the bucket and
+    holds every caller back, which is how a 429 from the API is honoured by
+    all threads at once.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self._lock = threading.Lock()
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    def set_rate(self, rate, capacity=None):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = float(rate)
+            self.capacity = float(capacity or rate)
+            self._tokens = min(self._tokens, self.capacity)
+
+    def acquire(self):
+        """Block until a token is available, then consume it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        """Stop handing out tokens for ``seconds`` (e.g. after a 429)."""
+        with self._lock:
+            now = time.monotonic()
+            self._blocked_until = max(self._blocked_until, now + seconds)
+            self._tokens = 0.0
+            self._updated = self._blocked_until
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = max(now, self._updated)
+
+
+class QuotaExhausted(Exception):
+    """Raised when a call would exceed the daily Ticketmaster allowance."""
+
+
+class QuotaBudget:
+    """Thread-safe view of today's Ticketmaster call budget.
+
+    ``used`` starts from the persisted daily counter. Essential calls (event
+    pages) may spend the budget down to zero; enrichment calls (the images
+    endpoint, stale lookups) stop once only ``reserve`` calls are left, so
+    the crawl itself is never starved by optional lookups.
+
+    With ``claim`` (see ``nyc.events.sync.quota._claimer``) calls are first
+    claimed from the shared counter in blocks of ``block``, so parallel
+    runs in other processes can never spend more than the day allows
+    between them; ``release`` hands the unspent part of the block back.
+    Without it the budget is local to this object.
+    """
+
+    PAGE = "page"
+    ENRICHMENT = "enrichment"
+
+    def __init__(self, limit, used=0, reserve=0, claim=None, block=1):
+        self._lock = threading.Lock()
+        self.limit = limit
+        self.used = used
+        self.reserve = reserve
+        self._claim = claim
+        self._block = max(1, block)
+        self._claimed = 0  # calls claimed from the shared counter and not spent yet
+
+    @property
+    def remaining(self):
+        return max(self.limit - self.used, 0)
+
+    def try_acquire(self, priority=PAGE):
+        """Reserve one call; False when the budget (or its enrichment share) is spent"""
+        floor = self.reserve if priority == self.ENRICHMENT else 0
+        with self._lock:
+            if self.limit - self.used <= floor:
+                return False
+            if self._claim:
+                if not self._claimed:
+                    granted, counted = self._claim(self._block, floor)
+                    # the counter now holds every call made today plus the block just claimed
+                    self._claimed, self.used = granted, counted - granted
+                    if not granted:
+                        return False
+                self._claimed -= 1
+            self.used += 1
+            return True
+
+    def acquire(self, priority=PAGE):
+        if not self.try_acquire(priority):
+            raise QuotaExhausted(f"Ticketmaster daily quota exhausted ({self.used}/{self.limit} calls)")
+
+    def release(self):
+        """Hand the claimed calls not spent yet back to the shared counter"""
+        with self._lock:
+            if self._claim and self._claimed:
+                self._claim(-self._claimed)
+                self._claimed = 0
+
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def retry_delay(headers, attempt, base=1.0, cap=60.0):
+    """Seconds to wait before retry number ``attempt`` (0-based).
+
+    ``Retry-After`` (seconds or HTTP date) wins when present. Otherwise the
+    delay is exponential in ``attempt`` with jitter in ``[50%, 100%]`` so
+    parallel fetchers do not retry in lockstep. Always capped at ``cap``.
+
+    Raises ``QuotaExhausted`` when Ticketmaster's rate-limit headers say the
+    daily allowance itself is spent (``Rate-Limit-Available: 0``): waiting
+    for ``Rate-Limit-Reset`` would take hours, not seconds.
+    """
+    headers = headers or {}
+    if str(headers.get("Rate-Limit-Available", "")).strip() == "0" and headers.get("Rate-Limit-Reset"):
+        try:
+            reset_in = int(headers["Rate-Limit-Reset"]) / 1000.0 - time.time()
+        except ValueError:
+            reset_in = 0
+        if reset_in > cap:
+            raise QuotaExhausted(f"Ticketmaster quota spent; resets in {int(reset_in)}s")
+    retry_after = headers.get("Retry-After")
+    if retry_after:
+        try:
+            delay = float(retry_after)
+        except ValueError:
+            try:
+                delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+            except (TypeError, ValueError):
+                delay = None
+        if delay is not None:
+            return min(max(delay, 0.0), cap)
+    return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+class _ConnectionCounter:
+    """Counts TCP connections opened by the pools of one ``PooledSession``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.opened = 0
+
+    def increment(self):
+        with self._lock:
+            self.opened += 1
+
+
+def _counting_pool(base, counter):
+    class CountingPool(base):
+        def _new_conn(self):
+            counter.increment()
+            return super()._new_conn()
+    return CountingPool
+
+
+class _PooledAdapter(HTTPAdapter):
+    def __init__(self, counter, **kwargs):
+        self._counter = counter
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool(HTTPConnectionPool, self._counter),
+            "https": _counting_pool(HTTPSConnectionPool, self._counter),
+        }
+
+
+class PooledSession:
+    """Keep-alive ``requests`` session shared by every sync call.
+
+    ``pool_hosts`` is the number of distinct hosts kept in the pool manager
+    and ``pool_size`` the connection limit per host; with ``pool_block`` a
+    thread waits for a free connection instead of opening extra ones. The
+    session counts requests and newly opened connections so callers can see
+    how often a connection was reused.
+    """
+
+    def __init__(self, pool_hosts=4, pool_size=8):
+        self.pool_hosts = pool_hosts
+        self.pool_size = pool_size
+        # (max retries, backoff base seconds, backoff cap seconds), set by the owner
+        self.retry_settings = (4, 1.0, 60.0)
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._connections = _ConnectionCounter()
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Accept-Encoding": "gzip, deflate",
+            "Connection": "keep-alive",
+        })
+        adapter = _PooledAdapter(
+            self._connections,
+            pool_connections=pool_hosts,
+            pool_maxsize=pool_size,
+            pool_block=True,
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url, **kwargs):
+        with self._lock:
+            self._requests += 1
+        return self.session.get(url, **kwargs)
+
+    def snapshot(self):
+        """Return cumulative ``(requests, connections_opened)`` counters."""
+        return self._requests, self._connections.opened
+
+    def close(self):
+        self.session.close()
+
+
+class WindowCrawler:
+    """Streams Discovery API pages for a ``[start, end)`` date range.
+
+    ``fetch_page(scope, start, end, page)`` is called from a bounded thread
+    pool and must return the decoded JSON of one page. ``scopes`` are opaque
+    hashable keys for independent queries over the same range (e.g. one per
+    sync profile); their pages share the pool and are interleaved. A window
+    whose first page reports more than ``max_depth`` events is halved until
+    it can be paged through; halving stops at ``min_window``.
+
+    ``pages()`` yields ``(page_key, events)`` as pages arrive, with at most
+    ``2 * workers`` requests in flight, so pages keep downloading while the
+    consumer works and memory stays bounded. ``page_key[0]`` is the scope.
+    The consumer reports committed pages through ``mark_done``;
+    ``frontier()`` is then the moment before which every event of every
+    scope has been committed, which is what a checkpoint stores.
+
+    ``complete`` is set once every page has been fetched. Windows that
+    still held more than ``max_depth`` events at ``min_window`` are listed
+    in ``truncated`` as ``(scope, start, end)``: only their first
+    ``max_depth`` events were reachable, so the crawl did not see them all.
+    """
+
+    def __init__(self, fetch_page, start, end, page_size, max_depth, min_window, workers=4, stats=None,
+                 scopes=(None,)):
+        self.fetch_page = fetch_page
+        self.start = start
+        self.end = end
+        self.page_size = page_size
+        self.max_depth = max_depth
+        self.min_window = min_window
+        self.workers = workers
+        self.stats = stats if stats is not None else {}
+        self.scopes = tuple(scopes) or (None,)
+        self.complete = False
+        self.truncated = []
+        # (scope, start, end) -> {"pages": total pages or None until page 0 arrived, "done": set of pages}
+        self._windows = {(scope, start, end): {"pages": None, "done": set()} for scope in self.scopes}
+
+    def pages(self):
+        stats = self.stats
+        for key in ("pages", "windows", "split_windows", "truncated_windows", "events"):
+            stats.setdefault(key, 0)
+        timings = stats.setdefault("timings", {})
+        backlog = deque((scope, self.start, self.end, 0) for scope in self.scopes)
+        pending = {}
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="tm-fetch")
+        try:
+            while backlog or pending:
+                while backlog and len(pending) < 2 * self.workers:
+                    scope, start, end, page = item = backlog.popleft()
+                    pending[pool.submit(self.fetch_page, scope, start, end, page)] = item
+                waited = time.monotonic()
+                done, _not_done = wait(pending, return_when=FIRST_COMPLETED)
+                timings["fetch"] = timings.get("fetch", 0.0) + time.monotonic() - waited
+                for future in done:
+                    scope, start, end, page = pending.pop(future)
+                    try:
+                        data = future.result()
+                    except QuotaExhausted as e:
+                        # Stop cleanly: what was fetched is kept, the rest waits for tomorrow's budget
+                        _logger.warning("%s; stopping the crawl at %s", e, start)
+                        stats["quota_exhausted"] = True
+                        return
+                    stats["pages"] += 1
+                    if page == 0:
+                        total = data.get("page", {}).get("totalElements", 0)
+                        if total > self.max_depth:
+                            if end - start > self.min_window:
+                                # Too deep to page through: halve the window and probe both halves
+                                middle = (start + (end - start) / 2).replace(microsecond=0)
+                                del self._windows[(scope, start, end)]
+                                for half in ((start, middle), (middle, end)):
+                                    self._windows[(scope,) + half] = {"pages": None, "done": set()}
+                                    backlog.append((scope, half[0], half[1], 0))
+                                stats["split_windows"] += 1
+                                continue
+                            _logger.warning("Ticketmaster window %s - %s holds %s events; only the first %s are reachable",
+                                            start, end, total, self.max_depth)
+                            stats["truncated_windows"] += 1
+                            self.truncated.append((scope, start, end))
+                        stats["windows"] += 1
+                        total_pages = max(1, min(data.get("page", {}).get("totalPages", 1), self.max_depth // self.page_size))
+                        self._windows[(scope, start, end)]["pages"] = total_pages
+                        backlog.extend((scope, start, end, next_page) for next_page in range(1, total_pages))
+                    events = data.get("_embedded", {}).get("events", [])
+                    stats["events"] += len(events)
+                    yield (scope, start, end, page), events
+            self.complete = True
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def mark_done(self, page_keys):
+        """Record pages whose events have been committed"""
+        for scope, start, end, page in page_keys:
+            window = self._windows.get((scope, start, end))
+            if window is not None:
+                window["done"].add(page)
+
+    def frontier(self):
+        """Start of the earliest window that still has uncommitted pages (``end`` when none)"""
+        open_starts = [
+            start for (_scope, start, _end), window in self._windows.items()
+            if window["pages"] is None or len(window["done"]) < window["pages"]
+        ]
+        return min(open_starts) if open_starts else self.end
+
+
+_COUNTER_LOCK = threading.Lock()
+
+
+def bump(stats, key, amount=1):
+    """Thread-safe ``stats[key] += amount`` for counters updated by worker threads"""
+    if stats is None:
+        return
+    with _COUNTER_LOCK:
+        stats[key] = stats.get(key, 0) + amount
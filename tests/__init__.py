@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+from . import test_nyc_events_sync
+from . import test_ticketmaster_client
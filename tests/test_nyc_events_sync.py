@@ -0,0 +1,525 @@
+# -*- coding: utf-8 -*-
+"""Tests of the ORM stages of the sync: upsert, batch create, savepoints, venues, addresses,
+images, change detection, the streaming pipeline, stale reconciliation and sharded crawls.
+
+Image downloads are patched out and crawls run against the local Discovery
+API stand-in of ``benchmarks/mock_ticketmaster.py``, so no test goes past
+the local machine.
+"""
+import hashlib
+import io
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from PIL import Image
+
+from odoo import fields, tools
+from odoo.tests.common import TransactionCase
+from odoo.tools import mute_logger
+
+from ..benchmarks.mock_ticketmaster import MockTicketmasterServer
+from ..models.sync_engine import RefreshTier
+from ..models.ticketmaster_client import QuotaBudget, QuotaExhausted
+
+MODULE = __name__.split(".")[2]
+SYNC_LOGGER = f"odoo.addons.{MODULE}.models.nyc_events_sync"
+
+
+def png(color):
+    """Small valid PNG, distinct per ``color``"""
+    buffer = io.BytesIO()
+    Image.new("RGB", (4, 4), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def tm_event(tm_id, days=3, **overrides):
+    """Discovery API event payload holding every field the sync reads"""
+    begin = datetime.now(timezone.utc).replace(microsecond=0) + timedelta(days=days)
+    event = {
+        "id": tm_id,
+        "name": f"Event {tm_id}",
+        "url": f"https://www.ticketmaster.com/event/{tm_id}",
+        "images": [{"url": f"https://img.test/{tm_id}.png", "width": 1024, "height": 576, "fallback": False}],
+        "dates": {
+            "start": {"dateTime": begin.strftime("%Y-%m-%dT%H:%M:%SZ")},
+            "end": {"dateTime": (begin + timedelta(hours=3)).strftime("%Y-%m-%dT%H:%M:%SZ")},
+            "status": {"code": "onsale"},
+        },
+        "classifications": [{"segment": {"name": "Music"}, "genre": {"name": "Rock"}}],
+        "_embedded": {"venues": [{
+            "id": "TESTV1",
+            "name": "Test Venue",
+            "postalCode": "10001",
+            "city": {"name": "New York"},
+            "state": {"stateCode": "NY"},
+            "country": {"countryCode": "US"},
+            "address": {"line1": "1 Broadway"},
+        }]},
+    }
+    event.update(overrides)
+    return event
+
+
+class SyncCase(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Sync = cls.env["nyc.events.sync"]
+        cls.Event = cls.env["event.event"].with_context(active_test=False)
+        cls.env["ir.config_parameter"].sudo().set_param("ticketmaster.api_key", "test-key")
+
+    def engine(self, **overrides):
+        overrides.setdefault("profiles", self.env["nyc.events.sync.profile"])
+        return self.Sync._sync_engine("cron", **overrides)
+
+    def patch_downloads(self, images):
+        """Serve image downloads from ``images`` (URL -> bytes); unknown URLs fail"""
+        return patch.object(type(self.Sync), "_download_image", lambda sync, url: images.get(url))
+
+    def upsert(self, events, engine, images=None):
+        """Run the upsert and image stages over ``events`` like one chunk of a crawl"""
+        image_jobs = []
+        counts = self.Sync._upsert_ticketmaster_events(events, engine, image_jobs)
+        with self.patch_downloads(images or {}):
+            self.Sync._download_event_images(image_jobs, engine.stats)
+        return counts
+
+    def patch_quota(self, limit=10 ** 6):
+        """Give the run a local quota instead of today's shared counter"""
+        return patch.object(type(self.Sync), "_ticketmaster_quota", lambda sync: (QuotaBudget(limit), None))
+
+    def tm(self, tm_id):
+        return self.Event.search([("ticketmaster_id", "=", tm_id)])
+
+    def patch_upsert(self, fail_ids):
+        """Make the upsert of ``fail_ids`` raise once its work is done; returns (patcher, upserted ids)"""
+        Sync = type(self.Sync)
+        upsert = Sync._upsert_ticketmaster_event
+        calls = []
+
+        def flaky(sync, event, *args, **kwargs):
+            calls.append(event.get("id"))
+            result = upsert(sync, event, *args, **kwargs)
+            if event.get("id") in fail_ids:
+                raise ValueError(f"upsert of {event['id']} failed")
+            return result
+
+        return patch.object(Sync, "_upsert_ticketmaster_event", flaky), calls
+
+
+class TestBatchCreate(SyncCase):
+
+    def count_creates(self):
+        """Patch ``event.event.create`` to record the size of every call; returns (patcher, sizes)"""
+        Event = type(self.env["event.event"])
+        create = Event.create
+        sizes = []
+
+        def spy(records, vals_list):
+            sizes.append(len(vals_list) if isinstance(vals_list, list) else 1)
+            return create(records, vals_list)
+
+        return patch.object(Event, "create", spy), sizes
+
+    def test_new_events_are_created_in_batches(self):
+        self.env["ir.config_parameter"].sudo().set_param("ticketmaster.create_batch_size", 2)
+        patcher, sizes = self.count_creates()
+        with patcher:
+            counts = self.Sync._upsert_ticketmaster_events([tm_event(f"NEW{index}") for index in range(5)],
+                                                           self.engine(stages=[]))
+        self.assertEqual(counts["created"], 5)
+        self.assertEqual(sizes, [2, 2, 1])
+        self.assertEqual(len(self.Event.search([("ticketmaster_id", "like", "NEW%")])), 5)
+
+    def test_duplicate_listing_keeps_the_latest_payload(self):
+        counts = self.Sync._upsert_ticketmaster_events(
+            [tm_event("DUP1"), tm_event("DUP1", name="Latest")], self.engine(stages=[]))
+        self.assertEqual((counts["created"], counts["skipped"]), (1, 1))
+        self.assertEqual(self.tm("DUP1").name, "Latest")
+
+    def test_existing_events_are_updated_not_created(self):
+        engine = self.engine(stages=[])
+        self.Sync._upsert_ticketmaster_events([tm_event("UPD1")], engine)
+        counts = self.Sync._upsert_ticketmaster_events([tm_event("UPD1", name="Changed"), tm_event("UPD2")], engine)
+        self.assertEqual((counts["created"], counts["updated"]), (1, 1))
+        self.assertEqual(len(self.tm("UPD1")), 1)
+
+    @mute_logger(SYNC_LOGGER)
+    def test_failed_batch_is_created_one_by_one(self):
+        engine = self.engine(stages=[])
+        bad = tm_event("BAD1")
+        bad["dates"]["end"]["dateTime"] = "2000-01-01T00:00:00Z"  # ends before it begins
+        counts = self.Sync._upsert_ticketmaster_events([tm_event("OK1"), bad, tm_event("OK2")], engine)
+        self.assertEqual((counts["created"], counts["failed"]), (2, 1))
+        self.assertTrue(self.tm("OK1") and self.tm("OK2"))
+        self.assertFalse(self.tm("BAD1"))
+        self.assertEqual(engine.failed_ids, ["BAD1"])
+
+
+class TestSavepoints(SyncCase):
+
+    @mute_logger(SYNC_LOGGER)
+    def test_failing_event_does_not_undo_the_others(self):
+        engine = self.engine(stages=[])
+        self.Sync._upsert_ticketmaster_events([tm_event("SP1"), tm_event("SP2")], engine)
+        patcher, calls = self.patch_upsert({"SP1"})
+        with patcher:
+            counts = self.Sync._upsert_ticketmaster_events(
+                [tm_event("SP1", name="Renamed 1"), tm_event("SP2", name="Renamed 2")], engine)
+        self.env.invalidate_all()
+        self.assertEqual((counts["updated"], counts["failed"]), (1, 1))
+        self.assertEqual(calls.count("SP1"), 2, "failed events are retried once")
+        self.assertEqual(self.tm("SP1").name, "Event SP1", "the write of the failed event was rolled back")
+        self.assertEqual(self.tm("SP2").name, "Renamed 2")
+        self.assertEqual(engine.failed_ids, ["SP1"])
+
+    @mute_logger(SYNC_LOGGER)
+    def test_event_failing_once_succeeds_on_retry(self):
+        engine = self.engine(stages=[])
+        Sync = type(self.Sync)
+        upsert = Sync._upsert_ticketmaster_event
+        failures = []
+
+        def fails_once(sync, event, *args, **kwargs):
+            if not failures:
+                failures.append(event["id"])
+                raise ValueError("transient failure")
+            return upsert(sync, event, *args, **kwargs)
+
+        with patch.object(Sync, "_upsert_ticketmaster_event", fails_once):
+            counts = self.Sync._upsert_ticketmaster_events([tm_event("SP3")], engine)
+        self.assertEqual((counts["created"], counts["failed"]), (1, 0))
+        self.assertTrue(self.tm("SP3"))
+        self.assertFalse(engine.failed_ids)
+
+
+class TestVenues(SyncCase):
+
+    def venue(self, tm_id, venue_id, name="Test Venue"):
+        event = tm_event(tm_id)
+        event["_embedded"]["venues"][0].update(id=venue_id, name=name)
+        return event
+
+    def test_venue_is_matched_by_id(self):
+        partner = self.env["res.partner"].create({"name": "Old Name", "ticketmaster_venue_id": "VEN1"})
+        self.Sync._upsert_ticketmaster_events([self.venue("VE1", "VEN1", "New Name")], self.engine(stages=[]))
+        self.assertEqual(self.tm("VE1").address_id, partner)
+        self.assertEqual(partner.name, "New Name")
+        self.assertEqual(partner.city, "New York")
+
+    def test_partner_without_venue_id_is_matched_by_name(self):
+        partner = self.env["res.partner"].create({"name": "Legacy Venue"})
+        self.Sync._upsert_ticketmaster_events([self.venue("VE2", "VEN2", "Legacy Venue")], self.engine(stages=[]))
+        self.assertEqual(self.tm("VE2").address_id, partner)
+        self.assertEqual(partner.ticketmaster_venue_id, "VEN2")
+
+    def test_venue_is_resolved_once_per_run(self):
+        cache = {}
+        venue = tm_event("VE3")["_embedded"]["venues"][0]
+        partner_id = self.Sync._get_or_create_venue_partner("Test Venue", venue, cache)
+        with patch.object(type(self.env["res.partner"]), "search", side_effect=AssertionError("searched again")):
+            self.assertEqual(self.Sync._get_or_create_venue_partner("Test Venue", venue, cache), partner_id)
+        self.assertEqual(cache, {"TESTV1": partner_id})
+
+    @mute_logger(SYNC_LOGGER)
+    def test_rolled_back_venue_is_dropped_from_the_cache(self):
+        engine = self.engine(stages=["images"])
+        # fails after the venue partner was created, inside the event's savepoint
+        with patch.object(type(self.Sync), "_select_event_image_url", side_effect=ValueError("images down")):
+            counts = self.Sync._upsert_ticketmaster_events([self.venue("VE4", "VEN4")], engine)
+        self.assertEqual(counts["failed"], 1)
+        self.assertNotIn("VEN4", engine.venue_cache, "the partner was rolled back with the savepoint")
+        self.assertFalse(self.env["res.partner"].search([("ticketmaster_venue_id", "=", "VEN4")]))
+
+        counts = self.Sync._upsert_ticketmaster_events([self.venue("VE5", "VEN4")], engine, [])
+        self.assertEqual(counts["created"], 1)
+        self.assertEqual(self.tm("VE5").address_id.ticketmaster_venue_id, "VEN4")
+
+
+class TestAddressTable(SyncCase):
+
+    def test_country_and_state_codes(self):
+        us = self.env.ref("base.us")
+        new_york = self.env["res.country.state"].search([("country_id", "=", us.id), ("code", "=", "NY")])
+        self.assertEqual(self.Sync._find_country("us"), us.id)
+        self.assertEqual(self.Sync._find_state("ny", "US"), new_york.id)
+        self.assertFalse(self.Sync._find_country("ZZ"))
+        self.assertFalse(self.Sync._find_state(False, "US"))
+
+    def test_table_follows_state_changes(self):
+        State = self.env["res.country.state"]
+        self.assertFalse(self.Sync._find_state("QQX"))
+        us_state = State.create({"name": "Test State", "code": "QQX", "country_id": self.env.ref("base.us").id})
+        self.assertEqual(self.Sync._find_state("QQX"), us_state.id, "the table is reloaded after a create")
+
+        ca_state = State.create({"name": "Test Province", "code": "QQX", "country_id": self.env.ref("base.ca").id})
+        self.assertFalse(self.Sync._find_state("QQX"), "a code used in two countries needs its country")
+        self.assertEqual(self.Sync._find_state("QQX", "CA"), ca_state.id)
+
+        ca_state.code = "QQY"
+        self.assertEqual(self.Sync._find_state("QQX"), us_state.id, "the table is reloaded after a write")
+
+
+class TestEventImages(SyncCase):
+
+    def test_each_image_job_gets_its_own_image(self):
+        now = fields.Datetime.now()
+        first, second = self.Event.create([
+            {"name": name, "date_begin": now + timedelta(days=1), "date_end": now + timedelta(days=2)}
+            for name in ("First", "Second")
+        ])
+        images = {"https://img.test/first.png": png("red"), "https://img.test/second.png": png("blue")}
+        with self.patch_downloads(images):
+            self.Sync._download_event_images([
+                (first.id, "https://img.test/first.png", "fingerprint-1"),
+                (second.id, "https://img.test/second.png", "fingerprint-2"),
+            ])
+        for event, url, fingerprint in ((first, "https://img.test/first.png", "fingerprint-1"),
+                                        (second, "https://img.test/second.png", "fingerprint-2")):
+            self.assertTrue(event.image_1920)
+            self.assertEqual(event.ticketmaster_image_url, url)
+            self.assertEqual(event.ticketmaster_image_checksum, hashlib.sha1(images[url]).hexdigest())
+            self.assertEqual(event.ticketmaster_payload_hash, fingerprint)
+
+    def test_same_url_is_not_downloaded_again(self):
+        engine = self.engine()
+        payload = tm_event("IMG1")
+        self.upsert([payload], engine, {"https://img.test/IMG1.png": png("red")})
+        self.tm("IMG1").ticketmaster_payload_hash = False  # force the event through the upsert again
+        stats = {}
+        with patch.object(type(self.Sync), "_download_image", side_effect=AssertionError("downloaded again")):
+            image_jobs = []
+            self.Sync._upsert_ticketmaster_events([payload], engine, image_jobs)
+            self.Sync._download_event_images(image_jobs, stats)
+        self.assertEqual(stats["images_skipped"], 1)
+        self.assertTrue(self.tm("IMG1").ticketmaster_payload_hash)
+
+
+class TestChangeDetection(SyncCase):
+
+    def test_unchanged_payload_is_not_written(self):
+        engine = self.engine()
+        images = {"https://img.test/FP1.png": png("red")}
+        self.assertEqual(self.upsert([tm_event("FP1")], engine, images)["created"], 1)
+        event = self.tm("FP1")
+        self.assertTrue(event.ticketmaster_payload_hash, "stored with the image")
+
+        self.assertEqual(self.upsert([tm_event("FP1")], engine, images)["unchanged"], 1)
+        noise = tm_event("FP1", priceRanges=[{"min": 10.0, "max": 99.0}], sales={"public": {}})
+        self.assertEqual(self.upsert([noise], engine, images)["unchanged"], 1, "fields the sync never reads")
+
+        self.assertEqual(self.upsert([tm_event("FP1", name="Renamed")], engine, images)["updated"], 1)
+        self.assertEqual(event.name, "Renamed")
+
+    def test_settings_are_part_of_the_fingerprint(self):
+        images = {"https://img.test/FP2.png": png("red")}
+        self.upsert([tm_event("FP2")], self.engine(), images)
+        counts = self.upsert([tm_event("FP2")], self.engine(auto_publish=False), images)
+        self.assertEqual(counts["updated"], 1)
+
+    def test_failed_image_download_is_retried(self):
+        engine = self.engine()
+        self.upsert([tm_event("FP3")], engine, {})
+        event = self.tm("FP3")
+        self.assertFalse(event.image_1920)
+        self.assertFalse(event.ticketmaster_payload_hash, "not fully synced without its image")
+
+        images = {"https://img.test/FP3.png": png("red")}
+        self.assertEqual(self.upsert([tm_event("FP3")], engine, images)["updated"], 1)
+        self.assertTrue(event.image_1920)
+        self.assertEqual(self.upsert([tm_event("FP3")], engine, images)["unchanged"], 1)
+
+    def test_without_image_stage_nothing_counts_as_unchanged(self):
+        engine = self.engine(stages=["reconcile"])
+        self.upsert([tm_event("FP4")], engine)
+        self.assertEqual(self.upsert([tm_event("FP4")], engine)["updated"], 1)
+
+
+class TestStaleReconciliation(SyncCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        now = fields.Datetime.now()
+        cls.window_start, cls.window_end = now, now + timedelta(days=30)
+        vals = {"date_end": now + timedelta(days=60), "website_published": True}
+        cls.seen, cls.gone, cls.later = cls.Event.create([
+            dict(vals, name="Seen", ticketmaster_id="ST1", date_begin=now + timedelta(days=1)),
+            dict(vals, name="Gone", ticketmaster_id="ST2", date_begin=now + timedelta(days=2)),
+            dict(vals, name="Later", ticketmaster_id="ST3", date_begin=now + timedelta(days=40)),
+        ])
+        cls.own = cls.Event.create(dict(vals, name="Own", date_begin=now + timedelta(days=3)))
+        cls.gone.ticketmaster_payload_hash = "fingerprint"
+
+    def retire(self):
+        return self.Sync._retire_stale_ticketmaster_events({"ST1"}, self.window_start, self.window_end)
+
+    def test_unseen_events_of_the_window_are_archived(self):
+        self.assertEqual(self.retire(), 1)
+        self.assertFalse(self.gone.active)
+        self.assertFalse(self.gone.website_published)
+        self.assertFalse(self.gone.ticketmaster_payload_hash, "rewritten in full if it comes back")
+        for event in self.seen | self.later | self.own:
+            self.assertTrue(event.active and event.website_published, event.name)
+
+    def test_stale_action_unpublish_keeps_them_active(self):
+        self.env["ir.config_parameter"].sudo().set_param("ticketmaster.stale_action", "unpublish")
+        self.assertEqual(self.retire(), 1)
+        self.assertTrue(self.gone.active)
+        self.assertFalse(self.gone.website_published)
+
+    def test_only_a_full_crawl_is_reconciled(self):
+        engine = self.engine()
+        engine.sync_state = self.env["nyc.events.sync.state"]._get_state("test")
+        engine.sync_state.write({"window_start": self.window_start, "window_end": self.window_end})
+        engine.seen_ids = {"ST1": 0}
+        with patch.object(type(self.Sync), "_lookup_ticketmaster_event", return_value=None):
+            engine._retire_stale(False, False)
+            engine._retire_stale(True, True)
+            engine._retire_stale(True, False, [(None, self.window_start, self.window_end)])
+            self.assertTrue(self.gone.active, "cut short, resumed or truncated: not every event was seen")
+            engine._retire_stale(True, False, [])
+        self.assertFalse(self.gone.active)
+        self.assertEqual(engine.stats["stale"], 1)
+
+    def confirm(self, lookup):
+        """Retire with stale candidates confirmed by ``lookup(tm_id)`` standing in for the Discovery API"""
+        engine = self.engine(stages=["reconcile"])
+        with patch.object(type(self.Sync), "_lookup_ticketmaster_event",
+                          side_effect=lambda api_key, tm_id, stats=None, quota=None: lookup(tm_id)):
+            return self.Sync._retire_stale_ticketmaster_events({"ST1"}, self.window_start, self.window_end, engine)
+
+    def test_rescheduled_event_is_updated_not_retired(self):
+        self.assertEqual(self.confirm(lambda tm_id: tm_event(tm_id, days=45)), 0)
+        self.assertTrue(self.gone.active)
+        self.assertGreater(self.gone.date_begin, self.window_end, "moved to its new date")
+
+    def test_event_still_listed_in_the_window_is_retired(self):
+        self.assertEqual(self.confirm(lambda tm_id: tm_event(tm_id, days=2)), 1)
+        self.assertFalse(self.gone.active)
+
+    def test_unconfirmed_events_wait_for_the_next_crawl(self):
+        def quota_spent(tm_id):
+            raise QuotaExhausted("Daily quota spent")
+
+        self.assertEqual(self.confirm(quota_spent), 0)
+        with mute_logger(SYNC_LOGGER):
+            self.assertEqual(self.confirm(lambda tm_id: 1 / 0), 0)
+        self.assertTrue(self.gone.active)
+
+    def test_candidates_past_the_lookup_limit_are_retired_unchecked(self):
+        self.env["ir.config_parameter"].sudo().set_param("ticketmaster.stale_lookups", 0)
+        self.assertEqual(self.confirm(lambda tm_id: self.fail("looked up")), 1)
+        self.assertFalse(self.gone.active)
+
+
+class TestStreamingSync(SyncCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = MockTicketmasterServer(events=600, venues=5).start()
+        cls.addClassCleanup(cls.server.stop)
+        cls.env["ir.config_parameter"].sudo().set_param("ticketmaster.api_url", cls.server.api_url)
+
+    def test_chunks_are_upserted_as_pages_arrive(self):
+        engine = self.engine(stages=[], chunk_size=200, force_all=True,
+                             tiers=[RefreshTier("test", timedelta(0), timedelta(days=365), timedelta(hours=1))])
+        Sync = type(self.Sync)
+        upsert = Sync._upsert_ticketmaster_events
+        chunks = []
+
+        def spy(sync, events, *args, **kwargs):
+            chunks.append((len(events), engine.stats["pages"], engine.sync_state.events_done))
+            return upsert(sync, events, *args, **kwargs)
+
+        with self.patch_quota(), patch.object(Sync, "_upsert_ticketmaster_events", spy):
+            engine.run()
+        self.assertFalse(engine.error)
+        self.assertEqual(chunks, [(200, 1, 0), (200, 2, 200), (200, 3, 400)],
+                         "each chunk is upserted as soon as its pages arrived and checkpointed before the next")
+        self.assertEqual(engine.counts["created"], 600)
+        self.assertEqual(engine.sync_state.state, "done")
+        self.assertEqual(engine.sync_state.resume_from, engine.sync_state.window_end)
+        self.assertEqual(engine.run_log.created_count, 600)
+
+
+class TestShardedCrawl(SyncCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = MockTicketmasterServer(events=50, venues=5).start()
+        cls.addClassCleanup(cls.server.stop)
+        ICP = cls.env["ir.config_parameter"].sudo()
+        ICP.set_param("ticketmaster.api_url", cls.server.api_url)
+        ICP.set_param("ticketmaster.shard_by", "window")
+        ICP.set_param("ticketmaster.shard_windows", 2)
+        ICP.set_param("ticketmaster.sync_stages", "reconcile")
+        cls.workers = cls.env["ir.cron"].browse([
+            cls.env.ref(f"{MODULE}.ir_cron_nyc_events_shard_worker_{index}").id for index in range(1, 5)
+        ])
+        cls.Run = cls.env["nyc.events.sync.run"]
+
+    def test_workers_ship_inactive(self):
+        self.assertFalse(any(self.workers.mapped("active")))
+        self.assertFalse(self.Sync._shard_workers())
+
+    def test_rate_is_split_between_the_workers_that_can_run(self):
+        self.workers.active = True
+        with patch.dict(tools.config.options, {"max_cron_threads": 2}):
+            self.assertEqual(self.Sync._ticketmaster_rate_limit(), 2.5)
+        self.workers[1:].active = False
+        self.assertEqual(self.Sync._ticketmaster_rate_limit(), 5.0)
+
+    def test_claim_order_and_abandoned_shards(self):
+        run = self.Run.create({"trigger": "cron"})
+        State, Shard = self.env["nyc.events.sync.state"], self.env["nyc.events.sync.shard"]
+        now = fields.Datetime.now()
+        shards = Shard.create([{
+            "run_id": run.id,
+            "sequence": sequence,
+            "tier": "test",
+            "state_id": State.create({"name": f"claim-{sequence}", "checkpoint_at": now}).id,
+        } for sequence in range(3)])
+        self.assertEqual(Shard._claim(timedelta(minutes=30)), shards[0])
+
+        shards[0].state = "running"
+        self.assertEqual(Shard._claim(timedelta(minutes=30)), shards[1])
+        (shards[1] | shards[2]).state = "done"
+        self.assertFalse(Shard._claim(timedelta(minutes=30)), "a running shard with a fresh checkpoint is busy")
+
+        shards[0].state_id.checkpoint_at = now - timedelta(hours=1)
+        self.assertEqual(Shard._claim(timedelta(minutes=30)), shards[0], "its worker died: taken over")
+
+    def test_shard_runs_are_never_taken_for_queued_requests(self):
+        parent = self.Run.create({"trigger": "cron"})
+        self.Run.create({"trigger": "shard", "state": "queued", "parent_id": parent.id})
+        self.assertFalse(self.Run._next_queued())
+        queued = self.Run.create({"trigger": "manual", "state": "queued"})
+        self.assertEqual(self.Run._next_queued(), queued)
+
+    def test_shards_are_crawled_and_merged(self):
+        self.workers.active = True
+        now = fields.Datetime.now()
+        gone = self.Event.create({"name": "Gone", "ticketmaster_id": "GONE1", "website_published": True,
+                                  "date_begin": now + timedelta(days=10), "date_end": now + timedelta(days=11)})
+        with self.patch_quota():
+            self.Sync._sync_nyc_events()
+            run = self.Run.search([("shard_ids", "!=", False)])
+            self.assertEqual(len(run), 1)
+            self.assertEqual(run.state, "running")
+            self.assertEqual(len(run.shard_ids), 6, "two date windows for each of the three tiers")
+            self.assertEqual(set(run.shard_ids.mapped("state")), {"pending"})
+
+            self.Sync.cron_run_sync_shards()
+        self.assertEqual(set(run.shard_ids.mapped("state")), {"done"})
+        self.assertEqual(set(run.child_ids.mapped("state")), {"done"})
+        self.assertEqual(run.state, "done")
+        self.assertEqual(run.created_count, 50)
+        self.assertEqual(len(self.Event.search([("ticketmaster_id", "like", "BENCH%")])), 50)
+        self.assertFalse(gone.active, "not listed by any shard and unknown to the API")
+        self.assertEqual(run.stale_count, 1)
+        self.assertFalse(run.shard_ids.mapped("state_id"), "shard checkpoints are dropped by the merge")
+        self.assertFalse(self.Run._next_queued())
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""Tests of the plain-Python sync helpers (no database needed).
+
+The crawler tests run against the local Discovery API stand-in of
+``benchmarks/mock_ticketmaster.py``.
+"""
+import threading
+import time
+from datetime import timedelta
+from email.utils import formatdate
+
+import requests
+
+from odoo.tests.common import BaseCase
+
+from ..benchmarks.mock_ticketmaster import MockTicketmasterServer, format_date
+from ..models.ticketmaster_client import QuotaBudget, QuotaExhausted, TokenBucket, WindowCrawler, retry_delay
+
+PAGE_SIZE = 200
+MAX_DEPTH = 1000
+
+
+class TestTokenBucket(BaseCase):
+
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(20)
+        started = time.monotonic()
+        for _i in range(20):
+            bucket.acquire()
+        self.assertLess(time.monotonic() - started, 0.1, "a full bucket hands out its capacity at once")
+        started = time.monotonic()
+        for _i in range(5):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.2, "then tokens come at the refill rate")
+
+    def test_pause_holds_every_caller(self):
+        bucket = TokenBucket(1000)
+        bucket.pause(0.2)
+        started = time.monotonic()
+        bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.15)
+
+    def test_set_rate_caps_tokens(self):
+        bucket = TokenBucket(100)
+        bucket.set_rate(5)
+        self.assertLessEqual(bucket.capacity, 5)
+        started = time.monotonic()
+        for _i in range(6):
+            bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - started, 0.15, "tokens above the new capacity are dropped")
+
+    def test_threads_share_the_ceiling(self):
+        bucket = TokenBucket(50, capacity=1)
+        started = time.monotonic()
+        threads = [threading.Thread(target=lambda: [bucket.acquire() for _i in range(5)]) for _t in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # 20 tokens at 50/s, the first one from the initial capacity
+        self.assertGreaterEqual(time.monotonic() - started, 19 / 50 - 0.05)
+
+
+class TestRetryDelay(BaseCase):
+
+    def test_retry_after_seconds(self):
+        self.assertEqual(retry_delay({"Retry-After": "3"}, 0), 3.0)
+        self.assertEqual(retry_delay({"Retry-After": "120"}, 0, cap=60.0), 60.0)
+        self.assertEqual(retry_delay({"Retry-After": "-5"}, 0), 0.0)
+
+    def test_retry_after_http_date(self):
+        delay = retry_delay({"Retry-After": formatdate(time.time() + 10, usegmt=True)}, 0)
+        self.assertTrue(8 <= delay <= 10.5, delay)
+
+    def test_invalid_retry_after_falls_back_to_backoff(self):
+        delay = retry_delay({"Retry-After": "soon"}, 2, base=1.0)
+        self.assertTrue(2.0 <= delay <= 4.0, delay)
+
+    def test_jittered_exponential_backoff(self):
+        for attempt in range(4):
+            delay = retry_delay({}, attempt, base=1.0, cap=60.0)
+            self.assertTrue(2 ** attempt / 2 <= delay <= 2 ** attempt, (attempt, delay))
+        self.assertLessEqual(retry_delay({}, 20, base=1.0, cap=60.0), 60.0)
+
+    def test_spent_daily_quota_is_not_waited_for(self):
+        reset = str(int((time.time() + 3600) * 1000))
+        with self.assertRaises(QuotaExhausted):
+            retry_delay({"Rate-Limit-Available": "0", "Rate-Limit-Reset": reset}, 0, cap=60.0)
+
+    def test_quota_reset_within_cap_is_waited_for(self):
+        reset = str(int((time.time() + 5) * 1000))
+        headers = {"Rate-Limit-Available": "0", "Rate-Limit-Reset": reset, "Retry-After": "5"}
+        self.assertEqual(retry_delay(headers, 0, cap=60.0), 5.0)
+
+
+class SharedCounter:
+    """In-memory stand-in for ``nyc.events.sync.quota._claimer``"""
+
+    def __init__(self, limit, calls=0):
+        self.limit = limit
+        self.calls = calls
+        self.lock = threading.Lock()
+
+    def claim(self, calls, floor=0):
+        with self.lock:
+            for size in dict.fromkeys((calls, 1) if calls > 0 else (calls,)):
+                if size <= 0 or self.calls + size <= self.limit - floor:
+                    self.calls = max(self.calls + size, 0)
+                    return size, self.calls
+            return 0, self.calls
+
+
+class TestQuotaBudget(BaseCase):
+
+    def test_pages_spend_down_to_zero(self):
+        quota = QuotaBudget(10, used=7, reserve=5)
+        self.assertTrue(quota.try_acquire(QuotaBudget.PAGE))
+        self.assertTrue(quota.try_acquire(QuotaBudget.PAGE))
+        self.assertTrue(quota.try_acquire(QuotaBudget.PAGE))
+        self.assertFalse(quota.try_acquire(QuotaBudget.PAGE))
+        self.assertEqual((quota.used, quota.remaining), (10, 0))
+        with self.assertRaises(QuotaExhausted):
+            quota.acquire()
+
+    def test_enrichment_keeps_the_reserve(self):
+        quota = QuotaBudget(10, used=3, reserve=5)
+        self.assertTrue(quota.try_acquire(QuotaBudget.ENRICHMENT))
+        self.assertTrue(quota.try_acquire(QuotaBudget.ENRICHMENT))
+        self.assertFalse(quota.try_acquire(QuotaBudget.ENRICHMENT), "the last 5 calls are kept for pages")
+        self.assertTrue(quota.try_acquire(QuotaBudget.PAGE))
+
+    def test_claims_blocks_from_the_shared_counter(self):
+        counter = SharedCounter(100, calls=10)
+        quota = QuotaBudget(100, used=10, claim=counter.claim, block=20)
+        quota.acquire()
+        self.assertEqual(counter.calls, 30, "a whole block is claimed up front")
+        self.assertEqual(quota.used, 11)
+        quota.release()
+        self.assertEqual(counter.calls, 11, "the unspent part of the block goes back")
+
+    def test_parallel_budgets_never_exceed_the_limit(self):
+        counter = SharedCounter(1000, calls=100)
+        spent = []
+
+        def spend():
+            quota = QuotaBudget(1000, used=100, claim=counter.claim, block=20)
+            calls = 0
+            while quota.try_acquire():
+                calls += 1
+            quota.release()
+            spent.append(calls)
+
+        threads = [threading.Thread(target=spend) for _t in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sum(spent), 900)
+        self.assertEqual(counter.calls, 1000)
+
+    def test_claims_stop_at_the_reserve_for_enrichment(self):
+        counter = SharedCounter(100, calls=90)
+        quota = QuotaBudget(100, used=80, reserve=5, claim=counter.claim, block=20)
+        calls = 0
+        while quota.try_acquire(QuotaBudget.ENRICHMENT):
+            calls += 1
+        self.assertEqual(calls, 5, "the counter, not the stale local figure, decides")
+        self.assertEqual(quota.used, 95)
+
+
+class TestWindowCrawler(BaseCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = MockTicketmasterServer(events=3000, venues=20).start()
+        cls.addClassCleanup(cls.server.stop)
+        cls.session = requests.Session()
+        cls.addClassCleanup(cls.session.close)
+
+    def fetch_page(self, scope, start, end, page):
+        resp = self.session.get(f"{self.server.api_url}/events.json", params={
+            "startDateTime": format_date(start),
+            "endDateTime": format_date(end),
+            "size": PAGE_SIZE,
+            "page": page,
+        }, timeout=10)
+        resp.raise_for_status()
+        return resp.json()
+
+    def crawler(self, fetch_page=None, min_window=timedelta(hours=1), scopes=(None,)):
+        start = self.server.catalogue.start.replace(microsecond=0) - timedelta(hours=1)
+        return WindowCrawler(fetch_page or self.fetch_page, start, start + timedelta(days=365), PAGE_SIZE,
+                             MAX_DEPTH, min_window, workers=4, scopes=scopes)
+
+    def catalogue_ids(self):
+        return {f"BENCH{index:07d}" for index in range(self.server.catalogue.count)}
+
+    def test_deep_windows_are_split_until_every_event_is_reachable(self):
+        crawler = self.crawler()
+        ids = set()
+        for _key, events in crawler.pages():
+            self.assertLessEqual(len(events), PAGE_SIZE)
+            ids.update(event["id"] for event in events)
+        self.assertTrue(crawler.complete)
+        self.assertEqual(ids, self.catalogue_ids())
+        self.assertGreater(crawler.stats["split_windows"], 0)
+        self.assertEqual(crawler.stats["truncated_windows"], 0)
+
+    def test_windows_are_not_split_below_min_window(self):
+        crawler = self.crawler(min_window=timedelta(days=400))
+        ids = {event["id"] for _key, events in crawler.pages() for event in events}
+        self.assertTrue(crawler.complete)
+        self.assertEqual(crawler.stats["truncated_windows"], 1)
+        self.assertEqual(crawler.truncated, [(None, crawler.start, crawler.end)])
+        self.assertEqual(len(ids), MAX_DEPTH, "only the first max_depth events of a truncated window are reachable")
+
+    def test_scopes_are_crawled_independently(self):
+        crawler = self.crawler(scopes=("a", "b"))
+        seen = {"a": set(), "b": set()}
+        for (scope, _start, _end, _page), events in crawler.pages():
+            seen[scope].update(event["id"] for event in events)
+        self.assertEqual(seen["a"], self.catalogue_ids())
+        self.assertEqual(seen["b"], self.catalogue_ids())
+
+    def test_frontier_follows_committed_pages(self):
+        crawler = self.crawler()
+        self.assertEqual(crawler.frontier(), crawler.start, "nothing committed yet")
+        keys = [key for key, _events in crawler.pages()]
+        self.assertEqual(crawler.frontier(), crawler.start, "fetched is not committed")
+
+        windows = sorted({(start, end) for _scope, start, end, _page in keys})
+        self.assertGreater(len(windows), 1)
+        last_start = windows[-1][0]
+        crawler.mark_done([key for key in keys if key[1] != last_start])
+        self.assertEqual(crawler.frontier(), last_start, "the earliest window with uncommitted pages")
+
+        crawler.mark_done([key for key in keys if key[1] == last_start])
+        self.assertEqual(crawler.frontier(), crawler.end)
+
+    def test_frontier_stays_at_an_uncommitted_earlier_page(self):
+        crawler = self.crawler()
+        keys = [key for key, _events in crawler.pages()]
+        first = min(keys, key=lambda key: (key[1], key[3]))
+        crawler.mark_done([key for key in keys if key != first])
+        self.assertEqual(crawler.frontier(), crawler.start)
+
+    def test_quota_exhaustion_stops_the_crawl(self):
+        quota = QuotaBudget(3)
+
+        def fetch_page(scope, start, end, page):
+            quota.acquire()
+            return self.fetch_page(scope, start, end, page)
+
+        crawler = self.crawler(fetch_page)
+        pages = list(crawler.pages())
+        self.assertFalse(crawler.complete)
+        self.assertTrue(crawler.stats["quota_exhausted"])
+        self.assertLessEqual(len(pages), 3)
+        self.assertLess(crawler.frontier(), crawler.end, "a cut-short crawl stays resumable")